@@ -0,0 +1,116 @@
+"""
+Cold-start import benchmark for urls_to_wordcloud.
+
+Each target is imported in a fresh interpreter, several times, and the
+median wall time reported along with any heavy dependencies it pulled in.
+With --check the run fails if a target loads a dependency it shouldn't, or
+if the bare package import exceeds --max-ms, so import-time regressions
+are caught before they reach the app or the counting worker processes.
+
+    python benchmarks/bench_import.py --check
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = [
+    'matplotlib', 'wordcloud', 'nltk', 'scipy', 'numpy', 'pyppeteer', 'requests', 'lxml',
+    'pandas', 'plotly',
+]
+
+# (name, statement, heavy modules the statement must not load)
+TARGETS = [
+    ('package', 'import urls_to_wordcloud', HEAVY_MODULES),
+    # What a counting worker process imports to unpickle a Preprocessor
+    ('worker', 'import urls_to_wordcloud.generate_wordcloud',
+     ['matplotlib', 'wordcloud', 'nltk', 'scipy', 'numpy', 'pyppeteer', 'requests', 'lxml']),
+    ('scraper', 'from urls_to_wordcloud import scrape_url_details',
+     ['matplotlib', 'wordcloud', 'nltk', 'scipy', 'pyppeteer']),
+    ('counting', 'from urls_to_wordcloud import NGramIndex, Preprocessor',
+     ['matplotlib', 'wordcloud', 'scipy', 'pyppeteer', 'requests', 'lxml']),
+]
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+heavy = {heavy!r}
+print(repr((elapsed, [name for name in heavy if name in sys.modules])))
+"""
+
+
+def measure(statement, repeat=5):
+    """Import in ``repeat`` fresh interpreters; return (seconds per run, heavy modules loaded)."""
+    times = []
+    loaded = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+            cwd=REPO_ROOT, capture_output=True, text=True
+        )
+        if completed.returncode:
+            raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+        elapsed, loaded = ast.literal_eval(completed.stdout.strip().splitlines()[-1])
+        times.append(elapsed)
+    return times, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--check', action='store_true',
+                        help="Exit non-zero on forbidden imports or a slow package import")
+    parser.add_argument('--max-ms', type=float, default=50.0,
+                        help="Budget for the bare package import with --check (default: 50)")
+    parser.add_argument('--output', help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    failures = []
+    for name, statement, forbidden in TARGETS:
+        try:
+            times, loaded = measure(statement, args.repeat)
+        except RuntimeError as e:
+            # A missing optional dependency shouldn't hide the other targets
+            print(f"{name:<10} skipped: {e}")
+            continue
+
+        median_ms = statistics.median(times) * 1000
+        unexpected = [module for module in loaded if module in forbidden]
+        results.append({
+            'target': name,
+            'statement': statement,
+            'median_ms': round(median_ms, 2),
+            'min_ms': round(min(times) * 1000, 2),
+            'loaded': loaded,
+            'unexpected': unexpected,
+        })
+        print(f"{name:<10} {median_ms:8.1f} ms  loaded: {', '.join(loaded) or '-'}"
+              + (f"  UNEXPECTED: {', '.join(unexpected)}" if unexpected else ""))
+
+        if unexpected:
+            failures.append(f"{statement!r} imported {', '.join(unexpected)}")
+        if name == 'package' and median_ms > args.max_ms:
+            failures.append(f"{statement!r} took {median_ms:.1f} ms (budget {args.max_ms} ms)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version, 'results': results}, f, indent=2)
+
+    if args.check and failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
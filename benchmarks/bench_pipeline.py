@@ -0,0 +1,374 @@
+"""
+Stage-by-stage benchmark of the scraping and wordcloud pipeline.
+
+Pages come from a local stand-in server (server.py) serving recorded
+static, JS-heavy, expired and huge job postings, and descriptions for the
+counting stages are synthesized from them (fixtures.py), so runs need no
+network and are repeatable. Each stage reports throughput, latency
+percentiles and the process's peak RSS so far, and the results are saved
+as JSON. Pass an earlier results file to --compare to see regressions.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --stages preprocess,frequencies --compare old.json
+
+Stages whose dependencies are missing (e.g. Chromium for rendering) are
+recorded as skipped rather than failing the run.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from fixtures import make_descriptions, page  # noqa: E402
+from server import FixtureServer  # noqa: E402
+
+
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+
+STAGES = ['fetch', 'parse', 'render', 'scrape', 'preprocess', 'frequencies', 'top_words', 'cloud']
+
+# Throughput drops larger than this fraction are flagged by --compare
+REGRESSION_TOLERANCE = 0.10
+
+
+def peak_rss_mb():
+    """The process's peak resident set size so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def timed(func, inputs):
+    """Call ``func`` on each input; return the per-call latencies in seconds."""
+    latencies = []
+    for value in inputs:
+        started = time.perf_counter()
+        func(value)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def summarize(stage, latencies, items, unit, wall=None, **extra):
+    """
+    Build a stage result. Throughput is ``items`` per second of ``wall`` time
+    (the summed latencies if not given, i.e. for serial stages).
+    """
+    ordered = sorted(latencies)
+    wall = wall if wall is not None else sum(latencies)
+    result = {
+        'stage': stage,
+        'calls': len(latencies),
+        'items': items,
+        'unit': unit,
+        'seconds': round(wall, 6),
+        'throughput': round(items / wall, 3) if wall else None,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+        'p90_ms': round(percentile(ordered, 0.90) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+    result.update(extra)
+    return result
+
+
+def bench_fetch(context):
+    from urls_to_wordcloud import SessionPool
+
+    server = context['server']
+    results = []
+    with SessionPool() as session_pool:
+        for kind in ('static', 'huge'):
+            urls = [server.url(kind, i) for i in range(context['pages'])]
+            sizes = []
+
+            def fetch(url):
+                response = session_pool.get(url)
+                response.raise_for_status()
+                sizes.append(len(response.content))
+
+            latencies = timed(fetch, urls)
+            results.append(summarize(f'fetch:{kind}', latencies, len(urls), 'pages',
+                                     megabytes_per_second=round(sum(sizes) / 2 ** 20 / sum(latencies), 2)))
+    return results
+
+
+def bench_parse(context):
+    from urls_to_wordcloud import extract_job_description
+
+    results = []
+    for kind in ('static', 'js_heavy', 'expired', 'huge'):
+        pages = [page(kind, i) for i in range(context['pages'])]
+        latencies = timed(lambda html: extract_job_description(html, quiet=True), pages)
+        megabytes = sum(len(html.encode('utf-8')) for html in pages) / 2 ** 20
+        results.append(summarize(f'parse:{kind}', latencies, len(pages), 'pages',
+                                 megabytes_per_second=round(megabytes / sum(latencies), 2)))
+    return results
+
+
+def bench_render(context):
+    from urls_to_wordcloud import BrowserPool
+
+    server = context['server']
+    urls = [server.url('js_heavy', i) for i in range(context['render_pages'])]
+    with BrowserPool() as browser_pool:
+        # The first render launches Chromium; report it separately from steady state
+        launch = timed(lambda url: browser_pool.render(url, sleep=0, scrolldown=0), urls[:1])
+        latencies = timed(lambda url: browser_pool.render(url, sleep=0, scrolldown=0), urls[1:])
+
+    return [summarize('render:js_heavy', latencies or launch, len(latencies or launch), 'pages',
+                      first_render_ms=round(launch[0] * 1000, 1))]
+
+
+def bench_scrape(context):
+    from urls_to_wordcloud import RENDER_NEVER, SessionPool, iter_scrape_urls
+
+    server = context['server']
+    urls = [server.url(kind, i) for i in range(context['pages'])
+            for kind in ('static', 'expired', 'huge')]
+
+    with SessionPool() as session_pool:
+        started = time.perf_counter()
+        details = [result for _, result in iter_scrape_urls(
+            urls, session_pool=session_pool, render=RENDER_NEVER, cache=False, profiles=False
+        )]
+        wall = time.perf_counter() - started
+
+    found = sum(1 for result in details if result['text'] and not result['error'])
+    return [summarize('scrape:mixed', [result['elapsed'] for result in details], len(urls),
+                      'pages', wall=wall, descriptions_found=found,
+                      parse_cpu_seconds=round(sum(result['parse_cpu'] for result in details), 4))]
+
+
+def bench_preprocess(context):
+    from urls_to_wordcloud import Preprocessor, preprocess_text
+
+    texts = context['texts']
+    results = []
+    for name, fast in (('fast', True), ('nltk', False)):
+        try:
+            # Warm up, and find out now if NLTK's data is missing
+            preprocessor = Preprocessor(fast=fast)
+            for text in texts[:10]:
+                preprocessor.tokenize(text)
+        except LookupError as e:
+            results.append({'stage': f'preprocess:{name}', 'skipped': str(e)})
+            continue
+
+        counts = []
+        latencies = timed(lambda text: counts.append(len(preprocess_text(text, 1, preprocessor))),
+                          texts)
+        results.append(summarize(f'preprocess:{name}', latencies, sum(counts), 'tokens',
+                                 documents_per_second=round(len(texts) / sum(latencies), 1)))
+    return results
+
+
+def bench_frequencies(context):
+    from urls_to_wordcloud import Preprocessor, calculate_word_frequencies
+
+    texts = context['texts']
+    preprocessor = Preprocessor(fast=True)
+    results = []
+    for n_gram_size in (1, 2, 3):
+        sizes = []
+        latencies = timed(
+            lambda _: sizes.append(len(calculate_word_frequencies(
+                texts, 1, n_gram_size, preprocessor=preprocessor, workers=context['workers']
+            ))),
+            range(context['repeat'])
+        )
+        results.append(summarize(f'frequencies:n{n_gram_size}', latencies,
+                                 len(texts) * len(latencies), 'documents',
+                                 unique_ngrams=sizes[-1], workers=context['workers']))
+    return results
+
+
+def bench_top_words(context):
+    from urls_to_wordcloud import Preprocessor, calculate_word_frequencies, get_top_words
+
+    preprocessor = Preprocessor(fast=True)
+    results = []
+    for n_gram_size in (1, 3):
+        counts = calculate_word_frequencies(context['texts'], 1, n_gram_size,
+                                            preprocessor=preprocessor)
+        latencies = timed(lambda _: get_top_words(counts, 20), range(context['repeat'] * 10))
+        results.append(summarize(f'top_words:n{n_gram_size}', latencies,
+                                 len(counts) * len(latencies), 'entries',
+                                 vocabulary=len(counts)))
+    return results
+
+
+def bench_cloud(context):
+    from urls_to_wordcloud import (
+        EXPORT_SCALE, LayoutCache, Preprocessor, calculate_word_frequencies, render_png
+    )
+
+    counts = calculate_word_frequencies(context['texts'], 2, 1, preprocessor=Preprocessor(fast=True))
+    results = []
+
+    # A fresh cache per call, so every call lays the words out again
+    sizes = []
+    latencies = timed(lambda _: sizes.append(len(render_png(counts, 50, layout_cache=LayoutCache()))),
+                      range(context['repeat']))
+    results.append(summarize('cloud:layout', latencies, len(latencies), 'images',
+                             png_bytes=sizes[-1]))
+
+    layout_cache = LayoutCache()
+    render_png(counts, 50, layout_cache=layout_cache)
+    for name, options in (('recolor', {'colormap': 'plasma'}),
+                          ('export', {'scale': EXPORT_SCALE, 'optimize': True})):
+        sizes = []
+        latencies = timed(
+            lambda _: sizes.append(len(render_png(counts, 50, layout_cache=layout_cache, **options))),
+            range(context['repeat'])
+        )
+        results.append(summarize(f'cloud:{name}', latencies, len(latencies), 'images',
+                                 png_bytes=sizes[-1]))
+    return results
+
+
+STAGE_FUNCTIONS = {
+    'fetch': bench_fetch,
+    'parse': bench_parse,
+    'render': bench_render,
+    'scrape': bench_scrape,
+    'preprocess': bench_preprocess,
+    'frequencies': bench_frequencies,
+    'top_words': bench_top_words,
+    'cloud': bench_cloud,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, tolerance=REGRESSION_TOLERANCE):
+    """Print throughput changes against an earlier run; return the regressed stages."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {result['stage']: result for result in json.load(f)['results']}
+
+    regressions = []
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get(result['stage'], {}).get('throughput')
+        after = result.get('throughput')
+        if not before or not after:
+            continue
+
+        change = after / before - 1
+        flag = ''
+        if change < -tolerance:
+            flag = '  REGRESSION'
+            regressions.append(result['stage'])
+        print(f"  {result['stage']:<22} {before:>14,.1f} -> {after:>14,.1f} "
+              f"{result['unit']}/s ({change:+.1%}){flag}")
+    return regressions
+
+
+def print_result(result):
+    for outcome in ('skipped', 'failed'):
+        if outcome in result:
+            print(f"{result['stage']:<22} {outcome}: {result[outcome]}")
+            return
+    print(f"{result['stage']:<22} {result['throughput']:>14,.1f} {result['unit']}/s  "
+          f"p50 {result['p50_ms']:9.3f} ms  p90 {result['p90_ms']:9.3f} ms  "
+          f"p99 {result['p99_ms']:9.3f} ms  peak RSS {result['peak_rss_mb']:7.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f"Comma-separated stages to run (default: all of {','.join(STAGES)})")
+    parser.add_argument('--documents', type=int, default=2000,
+                        help="Synthetic descriptions for the counting stages")
+    parser.add_argument('--pages', type=int, default=20, help="Pages per kind for fetch/parse")
+    parser.add_argument('--render-pages', type=int, default=6)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Workers for calculate_word_frequencies")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Seconds the stand-in server waits before each response")
+    parser.add_argument('--output', help="Results file (default: results/<time>-<commit>.json)")
+    parser.add_argument('--compare', help="An earlier results file to compare throughput against")
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help=f"Exit non-zero if a stage's throughput drops over "
+                             f"{REGRESSION_TOLERANCE:.0%} against --compare")
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    results = []
+    with FixtureServer(latency=args.latency) as server:
+        context = {
+            'server': server,
+            'pages': args.pages,
+            'render_pages': max(2, args.render_pages),
+            'repeat': args.repeat,
+            'workers': args.workers,
+            'texts': make_descriptions(args.documents),
+        }
+
+        for stage in stages:
+            try:
+                stage_results = STAGE_FUNCTIONS[stage](context)
+            except (ImportError, LookupError) as e:
+                stage_results = [{'stage': stage, 'skipped': f"{type(e).__name__}: {e}"}]
+            except Exception as e:
+                stage_results = [{'stage': stage, 'failed': f"{type(e).__name__}: {e}"}]
+
+            for result in stage_results:
+                print_result(result)
+            results.extend(stage_results)
+
+    commit = git_commit()
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{commit or 'unknown'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'commit': commit,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version,
+            'platform': platform.platform(),
+            'parameters': {key: value for key, value in vars(args).items()
+                           if key not in ('output', 'compare', 'fail_on_regression')},
+            'results': results,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Recorded job-posting pages and synthetic descriptions for the benchmarks.
+
+The pages in corpus/ are templates: ``{job_id}`` is replaced per URL so
+every page is distinct, and the JS-heavy page's ``{bundle}`` with a
+block of minified-looking JavaScript. The huge page is the static page
+padded with navigation markup and inline JSON to ``HUGE_PAGE_BYTES``.
+"""
+import os
+import random
+import re
+
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+PAGE_KINDS = ('static', 'js_heavy', 'expired', 'huge')
+
+JS_BUNDLE_BYTES = 300 * 1024
+HUGE_PAGE_BYTES = 5 * 1024 * 1024
+
+_templates = {}
+
+
+def _template(name):
+    if name not in _templates:
+        with open(os.path.join(CORPUS_DIR, f'{name}.html'), encoding='utf-8') as f:
+            _templates[name] = f.read()
+    return _templates[name]
+
+
+def _js_bundle(size):
+    chunk = ('!function(e,t){"use strict";var n=function(e){return e&&e.__esModule?e:{default:e}};'
+             't.render=function(r,o){for(var i=0;i<r.length;i++)o.appendChild(n(r[i]).default)}}'
+             '(window,window.app=window.app||{});\n')
+    return chunk * (size // len(chunk) + 1)
+
+
+def _padding(size):
+    row = ('<li class="nav-item"><a href="/jobs?page={0}">Open roles, page {0}</a></li>'
+           '<script type="application/json">{{"id": {0}, "tracking": "abcdef0123456789"}}</script>\n')
+    rows = []
+    total = 0
+    i = 0
+    while total < size:
+        line = row.format(i)
+        rows.append(line)
+        total += len(line)
+        i += 1
+    return '<ul class="sitemap">' + ''.join(rows) + '</ul>'
+
+
+def page(kind, job_id=0):
+    """Return the HTML of a fixture page of one of ``PAGE_KINDS``."""
+    if kind == 'huge':
+        html = _template('static')
+        html = html.replace('</footer>', '</footer>' + _padding(HUGE_PAGE_BYTES - len(html)))
+    elif kind == 'js_heavy':
+        html = _template('js_heavy').replace('{bundle}', _js_bundle(JS_BUNDLE_BYTES))
+    else:
+        html = _template(kind)
+    return html.replace('{job_id}', str(job_id))
+
+
+def _vocabulary():
+    words = set()
+    for name in ('static', 'js_heavy'):
+        text = re.sub(r'<[^>]+>', ' ', _template(name))
+        words.update(word.lower() for word in re.findall(r'[A-Za-z]{3,}', text))
+    return sorted(words)
+
+
+def make_descriptions(count, words_per_document=400, seed=0):
+    """
+    Generate ``count`` synthetic job descriptions with Zipf-distributed
+    words drawn from the fixture pages, deterministically for a ``seed``.
+    """
+    rng = random.Random(seed)
+    vocabulary = _vocabulary()
+    rng.shuffle(vocabulary)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+
+    descriptions = []
+    for _ in range(count):
+        words = rng.choices(vocabulary, weights, k=words_per_document)
+        # Break the text into sentences so tokenizers see some punctuation
+        for i in range(12, len(words), 12):
+            words[i - 1] += '.'
+        descriptions.append(' '.join(words))
+    return descriptions
@@ -0,0 +1,88 @@
+"""
+A local stand-in for job sites, serving the fixture pages over HTTP.
+
+    /<kind>/<job_id>    a fixture page, e.g. /static/7 or /huge/0
+
+Pages are rendered once per (kind, job_id) and kept in memory, so the
+server measures the client rather than itself. An optional ``latency``
+delays every response to simulate a remote host.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fixtures import PAGE_KINDS, page
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parts = self.path.split('?')[0].strip('/').split('/')
+        if len(parts) != 2 or parts[0] not in PAGE_KINDS or not parts[1].isdigit():
+            self.send_error(404)
+            return
+
+        body = self.server.page(parts[0], int(parts[1]))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The scraper stops reading bodies past its size limit (the 'huge' pages)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """Serve fixture pages on 127.0.0.1 from a background thread; use as a context manager."""
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, port=0):
+        super().__init__(('127.0.0.1', port), _FixtureHandler)
+        self.latency = latency
+        self._pages = {}
+        self._pages_lock = threading.Lock()
+        self._thread = None
+
+    def page(self, kind, job_id):
+        key = (kind, job_id)
+        with self._pages_lock:
+            if key not in self._pages:
+                self._pages[key] = page(kind, job_id).encode('utf-8')
+            return self._pages[key]
+
+    def url(self, kind, job_id=0):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/{kind}/{job_id}'
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='fixture-server',
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        self.server_close()
+        self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    with FixtureServer(port=port) as server:
+        print(f"Serving fixture pages at {server.url('static')} (and /js_heavy, /expired, /huge)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
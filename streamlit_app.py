@@ -1,43 +1,15 @@
-from urls_to_wordcloud import scrape_url, calculate_word_frequencies, get_top_words
+from urls_to_wordcloud import (
+    DocumentTermMatrix, NGramIndex, NearDuplicateIndex, Preprocessor, DOMAIN_STOPWORDS,
+    EXPORT_SCALE, TextSink, WEIGHTING_COUNT, WEIGHTING_TFIDF, canonicalize_url, dedupe_urls,
+    get_extract_pool, get_metrics, get_top_words, render_png, render_svg,
+    stream_word_frequencies
+)
 import streamlit as st
 import pandas as pd
-from requests_html import HTMLSession
-import re
 import time
-from collections import Counter
-import plotly.express as px
-import plotly.graph_objects as go
-from urllib.parse import urlparse
-import nltk
-from nltk.corpus import stopwords
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import io
-import base64
-import asyncio
-import nest_asyncio
-
-# Apply nest_asyncio to handle event loop issues in Streamlit
-nest_asyncio.apply()
-
-# Download NLTK data efficiently
-@st.cache_resource
-def download_nltk_data():
-    """Download NLTK data once and cache the result."""
-    try:
-        # Check if data already exists
-        nltk.data.find('corpora/stopwords')
-        nltk.data.find('tokenizers/punkt')
-        return True
-    except LookupError:
-        # Download missing data
-        with st.spinner("📥 Downloading NLTK data (this only happens once)..."):
-            nltk.download('stopwords', quiet=True)
-            nltk.download('punkt', quiet=True)
-        return True
-
-# Download NLTK data on app startup
-download_nltk_data()
+
+# NLTK data is checked by the package the first time a tokenizer needs it,
+# loading from its bundled nltk_data directory before trying to download.
 
 # Page configuration
 st.set_page_config(
@@ -83,52 +55,235 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def generate_wordcloud_plotly(word_counts, max_words=50):
-    """Generate wordcloud and return as base64 image for Streamlit."""
-    if not word_counts:
-        return None
-
-    # Create wordcloud
-    wordcloud = WordCloud(
-        width=1200,
-        height=800,
-        background_color="white",
-        max_words=max_words,
-        colormap='viridis',
-        relative_scaling=0.5
-    )
+COLORMAPS = ['viridis', 'plasma', 'inferno', 'magma', 'cividis', 'tab10', 'Dark2']
+
+
+def generate_wordcloud_plotly(word_counts, max_words=50, colormap='viridis'):
+    """
+    Generate a wordcloud preview as PNG bytes for Streamlit.
+
+    The image is drawn directly from the cached layout at preview size; use
+    ``render_png``/``render_svg`` with ``scale`` for full-resolution exports.
+    """
+    return render_png(word_counts, max_words, colormap=colormap)
+
+
+# The pipeline is cached stage by stage, so a widget change only reruns the
+# stages downstream of it: the color scheme recolors the cached layout,
+# max_words re-renders, min_frequency and
+# n_gram_size re-read the n-gram index, and only a new URL set (or new
+# tokenizer settings) re-scrapes, which the page cache makes cheap.
+# The scraped batch is kept in the session (see get_wordcloud_index).
+# Clicking Generate again on a batch where some URLs failed to fetch or
+# timed out scrapes it again, and batches are rebuilt after
+# BATCH_CACHE_TTL seconds, so transient failures aren't kept for good.
+BATCH_CACHE_TTL = 60 * 60
+
+# Bounds the distinct n-grams kept per size, so memory stays flat on big batches
+MAX_INDEX_ENTRIES = 200_000
+
+# Seconds a whole batch may take; URLs still unfinished then are reported as timed out
+SCRAPE_DEADLINE = 300
+
+
+# Seconds between provisional top-words/wordcloud refreshes during a batch
+PROVISIONAL_REFRESH_SECONDS = 3
+
+
+class BatchProgress:
+    """
+    Live display of a running batch, fed one pipeline event per URL: a
+    progress bar, a per-URL status table, and provisional top words and
+    wordcloud from the counts so far.
+    """
+
+    def __init__(self, n_gram_size, max_words):
+        self.n_gram_size = n_gram_size
+        self.max_words = max_words
+        self.progress_bar = st.progress(0)
+        self.status_text = st.empty()
+        self.url_table = st.empty()
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            self.top_words = st.empty()
+        with col2:
+            self.wordcloud = st.empty()
+        self.rows = []
+        self.last_refresh = None
+
+    def __call__(self, event):
+        total = event['total'] or event['completed']
+        self.progress_bar.progress(event['completed'] / total)
+        self.status_text.text(
+            f"🔄 Scraped {event['completed']}/{total} URLs in {event['batch_elapsed']:.1f}s "
+            f"(last: {event['url']} in {event['elapsed']:.1f}s)"
+        )
 
-    wordcloud.generate_from_frequencies(word_counts)
+        if event['error']:
+            status = f"❌ {event['error']}"
+        elif event['duplicate_of']:
+            status = "🔁 Duplicate"
+        else:
+            status = "✅"
+        self.rows.append({
+            'URL': event['url'],
+            'Status': status,
+            'Source': event['tier'] or '',
+            'Cached': event['cached'],
+            'Seconds': round(event['elapsed'], 2),
+            'Parse CPU (ms)': round(event['parse_cpu'] * 1000, 1),
+            'Characters': event['characters'],
+        })
+        self.url_table.dataframe(pd.DataFrame(self.rows), use_container_width=True)
+
+        # Refresh the provisional results on the first event, then periodically
+        now = time.perf_counter()
+        if self.last_refresh is None or now - self.last_refresh >= PROVISIONAL_REFRESH_SECONDS:
+            self.last_refresh = now
+            top_words = event['index'].top(self.n_gram_size, self.max_words)
+            if top_words:
+                self.top_words.dataframe(
+                    pd.DataFrame(top_words[:10], columns=['Word', 'Frequency']),
+                    use_container_width=True
+                )
+                wordcloud_img = generate_wordcloud_plotly(dict(top_words), self.max_words)
+                if wordcloud_img:
+                    self.wordcloud.image(wordcloud_img, caption="Provisional wordcloud",
+                                         use_container_width=True)
+
+    def clear(self):
+        for element in (self.progress_bar, self.status_text, self.url_table,
+                        self.top_words, self.wordcloud):
+            element.empty()
+
+
+def build_wordcloud_index(urls, extra_stopwords=(), fast_tokenizer=False, on_event=None):
+    """
+    Scrape a tuple of URLs and count their 1-, 2- and 3-grams as results
+    arrive.
+
+    Pages are parsed and rendered in the extract worker processes, so a
+    slow page or a bloated browser can't stall the app. Scraped texts are
+    streamed to a temporary file for the Raw Data tab rather than kept in
+    memory; the batch's ``text_sink`` deletes it when closed or garbage
+    collected. Near-duplicate descriptions are only counted once. Results
+    are keyed by canonical URL. ``on_event`` is called with each per-URL
+    pipeline event.
+    """
+    preprocessor = Preprocessor(extra_stopwords=extra_stopwords, fast=fast_tokenizer)
+    index = NGramIndex(max_n=3, max_entries=MAX_INDEX_ENTRIES, preprocessor=preprocessor)
+    scraped_results = {}
+    unfinished = 0
+
+    text_sink = TextSink()
+    try:
+        for event in stream_word_frequencies(urls, index=index, text_sink=text_sink,
+                                             on_event=on_event,
+                                             near_duplicates=NearDuplicateIndex(),
+                                             use_async=True, deadline=SCRAPE_DEADLINE,
+                                             extract_pool=get_extract_pool()):
+            event.pop('index')
+            # Exceptions don't always pickle or print cleanly, so keep errors as strings
+            event['error'] = str(event['error']) if event['error'] else ''
+            scraped_results[canonicalize_url(event['url'])] = event
+            # No tier: the page was never extracted (fetch error, timeout, ...)
+            if event['error'] and event['tier'] is None:
+                unfinished += 1
+    except BaseException:
+        text_sink.close()
+        raise
+    text_sink.flush()
+
+    return {
+        'index': index,
+        'scraped_results': scraped_results,
+        'text_sink': text_sink,
+        'text_path': text_sink.path,
+        'total_characters': text_sink.characters,
+        'total_words': text_sink.words,
+        'successful_scrapes': text_sink.documents,
+        'unfinished': unfinished,
+    }
+
+
+def discard_batch():
+    """Drop the session's scraped batch, deleting its text file."""
+    batch = st.session_state.pop('batch', None)
+    if batch is not None:
+        batch['text_sink'].close()
 
-    # Convert to image
-    fig, ax = plt.subplots(figsize=(15, 10))
-    ax.imshow(wordcloud, interpolation="bilinear")
-    ax.axis("off")
-    plt.tight_layout()
 
-    # Convert to base64
-    img_buffer = io.BytesIO()
-    plt.savefig(img_buffer, format='png', bbox_inches='tight', dpi=300)
-    img_buffer.seek(0)
-    img_str = base64.b64encode(img_buffer.getvalue()).decode()
-    plt.close()
+def get_wordcloud_index(urls, extra_stopwords=(), fast_tokenizer=False, on_event=None):
+    """
+    Return the session's scraped batch, building it with
+    ``build_wordcloud_index`` if there is none yet, it was built for other
+    URLs or tokenizer settings, or it is older than BATCH_CACHE_TTL.
+
+    The batch is kept in ``st.session_state`` rather than a Streamlit cache:
+    the live progress display updates elements created outside the scrape,
+    which a cached function can't replay on a cache hit. A replaced batch's
+    text file is deleted straight away.
+    """
+    key = (urls, extra_stopwords, fast_tokenizer)
+    batch = st.session_state.get('batch')
+    if batch is None or batch['key'] != key or time.time() - batch['built_at'] > BATCH_CACHE_TTL:
+        discard_batch()
+        batch = build_wordcloud_index(urls, extra_stopwords, fast_tokenizer, on_event=on_event)
+        batch.update(key=key, built_at=time.time())
+        st.session_state['batch'] = batch
+    return batch
+
+
+@st.cache_resource(show_spinner=False)
+def build_document_term_matrix(text_path, n_gram_size, extra_stopwords=(), fast_tokenizer=False):
+    """
+    Build a sparse document-term matrix from the scraped texts, one
+    description per line of ``text_path``, cached by all four arguments.
+    """
+    preprocessor = Preprocessor(extra_stopwords=extra_stopwords, fast=fast_tokenizer)
+    with open(text_path, encoding='utf-8') as text_file:
+        documents = (line.rstrip('\n') for line in text_file)
+        return DocumentTermMatrix.from_texts(documents, n_gram_size, preprocessor)
+
+
+@st.cache_data(show_spinner=False)
+def render_wordcloud(word_counts, max_words, colormap='viridis'):
+    """Render the wordcloud preview, cached by (word_counts, max_words, colormap)."""
+    return generate_wordcloud_plotly(word_counts, max_words, colormap)
 
-    return img_str
 
+@st.cache_data(show_spinner=False)
+def export_wordcloud(word_counts, max_words, colormap='viridis'):
+    """Render full-resolution PNG and SVG exports from the same layout as the preview."""
+    png = render_png(word_counts, max_words, scale=EXPORT_SCALE, colormap=colormap, optimize=True)
+    svg = render_svg(word_counts, max_words, scale=EXPORT_SCALE, colormap=colormap)
+    return png, svg
 
-def create_wordcloud_from_urls(urls, n_gram_size=1, min_frequency=2, max_words=50):
+
+def create_wordcloud_from_urls(urls, n_gram_size=1, min_frequency=2, max_words=50,
+                               extra_stopwords=(), fast_tokenizer=False, weighting=WEIGHTING_COUNT,
+                               on_event=None):
     """
     Scrape job descriptions from URLs and generate a wordcloud.
-    Streamlit Cloud compatible version using requests_html.
+    Streamlit Cloud compatible version using pooled sessions and browsers.
+    ``weighting`` is 'count' for raw frequencies or 'tfidf' to weight words
+    by how specific they are to individual postings. ``on_event`` is called
+    with each per-URL pipeline event while scraping.
     """
+    result = {
+        'success': False,
+        'message': '',
+        'word_counts': {},
+        'text_path': None,
+        'total_characters': 0,
+        'total_words': 0,
+        'count_error': 0,
+        'scraped_results': {}
+    }
+
     if not urls:
-        return {
-            'success': False,
-            'message': 'No URLs provided.',
-            'word_counts': {},
-            'combined_text': '',
-            'scraped_results': {}
-        }
+        result['message'] = 'No URLs provided.'
+        return result
 
     # Validate URLs
     valid_urls = []
@@ -137,59 +292,120 @@ def create_wordcloud_from_urls(urls, n_gram_size=1, min_frequency=2, max_words=5
             valid_urls.append(url)
 
     if not valid_urls:
-        return {
-            'success': False,
-            'message': 'No valid URLs found.',
-            'word_counts': {},
-            'combined_text': '',
-            'scraped_results': {}
-        }
-
-    # Scrape job descriptions
-    scraped_results = {}
-    all_texts = []
-    successful_scrapes = 0
-
-    for url in valid_urls:
-        domain = urlparse(url).netloc
-        text, error = scrape_url(url)
-        scraped_results[domain] = (text, error)
-
-        if not error:
-            all_texts.append(text)
-            successful_scrapes += 1
-
-    if not all_texts:
-        return {
-            'success': False,
-            'message': f'No content was successfully scraped from {len(valid_urls)} URLs.',
-            'word_counts': {},
-            'combined_text': '',
-            'scraped_results': scraped_results
-        }
-
-    # Combine all text
-    combined_text = " ".join(all_texts)
+        result['message'] = 'No valid URLs found.'
+        return result
+
+    # Scrape each posting once, however many tracking-parameter variants were pasted
+    unique_urls = dedupe_urls(valid_urls).values()
+
+    # Scrape job descriptions and count words as they arrive
+    scraped = get_wordcloud_index(
+        tuple(sorted(unique_urls)), tuple(sorted(extra_stopwords)), fast_tokenizer,
+        on_event=on_event
+    )
+    result['scraped_results'] = scraped['scraped_results']
+
+    if not scraped['successful_scrapes']:
+        result['message'] = f'No content was successfully scraped from {len(valid_urls)} URLs.'
+        return result
+
+    result['text_path'] = scraped['text_path']
+    result['total_characters'] = scraped['total_characters']
+    result['total_words'] = scraped['total_words']
 
     # Calculate word frequencies
-    word_counts = calculate_word_frequencies([combined_text], min_frequency, n_gram_size)
+    if weighting == WEIGHTING_COUNT:
+        word_counts = scraped['index'].word_counts(n_gram_size, min_frequency)
+        # Non-zero once the index has pruned rare n-grams to stay within MAX_INDEX_ENTRIES
+        result['count_error'] = scraped['index'].max_error[n_gram_size]
+    else:
+        matrix = build_document_term_matrix(
+            scraped['text_path'], n_gram_size, tuple(sorted(extra_stopwords)), fast_tokenizer
+        )
+        word_counts = matrix.to_dict(weighting, min_frequency)
 
     if not word_counts:
-        return {
-            'success': False,
-            'message': f'No words found matching the minimum frequency criteria ({min_frequency}).',
-            'word_counts': {},
-            'combined_text': combined_text,
-            'scraped_results': scraped_results
-        }
+        result['message'] = f'No words found matching the minimum frequency criteria ({min_frequency}).'
+        return result
 
-    return {
-        'success': True,
-        'message': f'Successfully generated wordcloud from {successful_scrapes} URLs with {len(word_counts)} unique words.',
-        'word_counts': word_counts,
-        'combined_text': combined_text,
-        'scraped_results': scraped_results
-    }
+    result['success'] = True
+    result['message'] = f"Successfully generated wordcloud from {scraped['successful_scrapes']} URLs with {len(word_counts)} unique words."
+    result['word_counts'] = word_counts
+    return result
+
+
+def show_diagnostics(metrics):
+    """
+    Show the collected per-stage and per-domain metrics.
+
+    The metrics are process-wide and shared by every session, so they are
+    only read here: collection is switched on with ``JD_WORDCLOUD_METRICS``.
+    """
+    if not metrics.enabled:
+        st.info("Diagnostics aren't being collected. Start the app with "
+                "JD_WORDCLOUD_METRICS=1, then generate a wordcloud from new URLs to see "
+                "where the time goes.")
+        return
+
+    snapshot = metrics.snapshot()
+    if not snapshot['counters'] and not snapshot['timers']:
+        st.info("No metrics yet. Cached results aren't re-measured, so try new URLs.")
+        return
+
+    fetched_mb = metrics.counter_total('bytes_fetched') / (1024 * 1024)
+    cache_hits = metrics.counter_total('cache_hits')
+    cache_lookups = cache_hits + metrics.counter_total('cache_misses')
+    selector_hits = metrics.counter_total('selector_hits')
+    selections = selector_hits + metrics.counter_total('selector_misses')
+    tokenize_seconds = sum(timer['seconds'] for timer in snapshot['timers']
+                           if timer['name'] == 'tokenize')
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("Fetched", f"{fetched_mb:.1f} MB")
+    with col2:
+        st.metric("Cache Hit Rate", f"{cache_hits / cache_lookups:.0%}" if cache_lookups else "-")
+    with col3:
+        st.metric("Render Fallbacks", metrics.counter_total('render_fallbacks'))
+    with col4:
+        st.metric("Selector Hit Rate", f"{selector_hits / selections:.0%}" if selections else "-")
+    with col5:
+        tokens = metrics.counter_total('tokens')
+        st.metric("Tokens/sec", f"{tokens / tokenize_seconds:,.0f}" if tokenize_seconds else "-")
+
+    # Time per stage, summed over domains
+    stages = {}
+    for timer in snapshot['timers']:
+        stage = stages.setdefault(timer['name'], {'Stage': timer['name'], 'Calls': 0,
+                                                  'Total (s)': 0.0, 'Max (ms)': 0.0})
+        stage['Calls'] += timer['count']
+        stage['Total (s)'] += timer['seconds']
+        stage['Max (ms)'] = max(stage['Max (ms)'], timer['max_seconds'] * 1000)
+    for stage in stages.values():
+        stage['Mean (ms)'] = stage['Total (s)'] * 1000 / stage['Calls']
+
+    st.subheader("Time by Stage")
+    st.dataframe(pd.DataFrame(stages.values()).sort_values('Total (s)', ascending=False)
+                 .round(3), use_container_width=True)
+
+    # One row per domain, one column per counter or timer
+    domains = {}
+    for counter in snapshot['counters']:
+        domain = counter['labels'].get('domain')
+        if domain:
+            row = domains.setdefault(domain, {'Domain': domain})
+            row[counter['name']] = row.get(counter['name'], 0) + counter['value']
+    for timer in snapshot['timers']:
+        domain = timer['labels'].get('domain')
+        if domain:
+            row = domains.setdefault(domain, {'Domain': domain})
+            column = f"{timer['name']} (s)"
+            row[column] = row.get(column, 0.0) + timer['seconds']
+
+    if domains:
+        st.subheader("By Domain")
+        st.dataframe(pd.DataFrame(domains.values()).fillna(0).round(3),
+                     use_container_width=True)
 
 
 def validate_urls(urls):
@@ -243,6 +459,52 @@ def main():
             help="Maximum number of words to display in the wordcloud"
         )
 
+        colormap = st.selectbox(
+            "Color Scheme",
+            options=COLORMAPS,
+            index=0,
+            help="Recoloring reuses the word layout, so it is fast"
+        )
+
+        weighting_label = st.selectbox(
+            "Word Weighting",
+            options=["Frequency", "TF-IDF"],
+            index=0,
+            help="TF-IDF favours words specific to a few postings over boilerplate that appears in all of them"
+        )
+        weighting = WEIGHTING_TFIDF if weighting_label == "TF-IDF" else WEIGHTING_COUNT
+        weight_column = 'Weight' if weighting == WEIGHTING_TFIDF else 'Frequency'
+
+        st.subheader("Text Processing")
+        ignore_common_words = st.checkbox(
+            "Ignore common job-posting words",
+            value=False,
+            help="Leave out words like 'experience' and 'team' that appear in nearly every posting"
+        )
+
+        custom_stopwords_input = st.text_input(
+            "Custom Stopwords",
+            help="Comma-separated words to leave out of the wordcloud"
+        )
+
+        fast_tokenizer = st.checkbox(
+            "Fast tokenizer",
+            value=True,
+            help="Split words with a single regex instead of NLTK's tokenizer"
+        )
+
+        metrics = get_metrics()
+        show_diagnostics_tab = st.checkbox(
+            "Show diagnostics",
+            value=metrics.enabled,
+            help="Show the time spent in each stage (fetch, render, parse, tokenize, layout) "
+                 "per domain. Collected while the app runs with JD_WORDCLOUD_METRICS=1."
+        )
+
+        extra_stopwords = {word.strip().lower() for word in custom_stopwords_input.split(',') if word.strip()}
+        if ignore_common_words:
+            extra_stopwords |= DOMAIN_STOPWORDS
+
         st.markdown("---")
         st.markdown("### 📋 Instructions")
         st.markdown("""
@@ -292,10 +554,18 @@ def main():
             st.metric("Total URLs", len(urls))
             st.metric("Valid URLs", len(valid_urls))
             st.metric("Invalid URLs", len(urls) - len(valid_urls))
+            st.metric("Duplicate URLs", len(valid_urls) - len(dedupe_urls(valid_urls)))
         else:
             st.info("Enter URLs to see statistics")
 
-    # Processing and results
+    # Processing and results. The submitted URLs are kept in the session, so
+    # changing a setting afterwards reruns the cached pipeline without another
+    # click on Generate.
+    if generate_button and not urls:
+        st.session_state.pop('submitted_urls', None)
+        st.warning("⚠️ Please enter at least one URL to generate a wordcloud.")
+        return
+
     if generate_button and urls:
         valid_urls, _ = validate_urls(urls)
 
@@ -303,43 +573,71 @@ def main():
             st.error("❌ No valid URLs to process. Please check your input.")
             return
 
-        # Progress tracking
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        # Generating again retries a batch whose URLs failed to fetch or timed out
+        batch = st.session_state.get('batch')
+        if batch is not None and batch['unfinished']:
+            discard_batch()
+        st.session_state['submitted_urls'] = valid_urls
 
-        try:
-            # Update status
-            status_text.text("🔄 Scraping job descriptions (this may take a moment for JavaScript rendering)...")
-            progress_bar.progress(25)
+    submitted_urls = st.session_state.get('submitted_urls')
+
+    if submitted_urls:
+        valid_urls = submitted_urls
+
+        # Live progress, driven by per-URL events while the batch runs
+        progress = BatchProgress(n_gram_size, max_words)
 
+        try:
             # Generate wordcloud
             result = create_wordcloud_from_urls(
                 urls=valid_urls,
                 n_gram_size=n_gram_size,
                 min_frequency=min_frequency,
-                max_words=max_words
+                max_words=max_words,
+                extra_stopwords=extra_stopwords,
+                fast_tokenizer=fast_tokenizer,
+                weighting=weighting,
+                on_event=progress
             )
 
-            progress_bar.progress(100)
-            status_text.text("✅ Processing complete!")
-            time.sleep(1)
-            progress_bar.empty()
-            status_text.empty()
+            progress.clear()
 
             # Display results
             if result['success']:
                 st.success(result['message'])
 
                 # Results tabs
-                tab1, tab2, tab3, tab4 = st.tabs(["📊 Wordcloud", "📋 Top Words", "📈 Statistics", "📄 Raw Data"])
+                tab_labels = ["📊 Wordcloud", "📋 Top Words", "📈 Statistics", "📄 Raw Data"]
+                if show_diagnostics_tab:
+                    tab_labels.append("🩺 Diagnostics")
+                tab1, tab2, tab3, tab4, *tab5 = st.tabs(tab_labels)
 
                 with tab1:
                     st.subheader("Generated Wordcloud")
 
                     # Generate and display wordcloud
-                    wordcloud_img = generate_wordcloud_plotly(result['word_counts'], max_words)
+                    wordcloud_img = render_wordcloud(result['word_counts'], max_words, colormap)
                     if wordcloud_img:
-                        st.image(f"data:image/png;base64,{wordcloud_img}", use_container_width=True)
+                        st.image(wordcloud_img, use_container_width=True)
+
+                        # Full-resolution files are only rendered when asked for
+                        if st.checkbox("Prepare full-resolution downloads"):
+                            png, svg = export_wordcloud(result['word_counts'], max_words, colormap)
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                st.download_button(
+                                    label="📥 Download PNG",
+                                    data=png,
+                                    file_name="wordcloud.png",
+                                    mime="image/png"
+                                )
+                            with col2:
+                                st.download_button(
+                                    label="📥 Download SVG",
+                                    data=svg,
+                                    file_name="wordcloud.svg",
+                                    mime="image/svg+xml"
+                                )
                     else:
                         st.error("Could not generate wordcloud")
 
@@ -349,19 +647,27 @@ def main():
 
                     if top_words:
                         # Create a DataFrame for better display
-                        df_top_words = pd.DataFrame(top_words, columns=['Word', 'Frequency'])
+                        df_top_words = pd.DataFrame(top_words, columns=['Word', weight_column])
 
                         # Display as table
                         st.dataframe(df_top_words, use_container_width=True)
+                        if result['count_error']:
+                            st.caption(
+                                f"Counts are approximate: rare n-grams were pruned to bound memory, "
+                                f"so each count may be low by up to {result['count_error']}."
+                            )
+
+                        # Create bar chart. Plotly is slow to import, so it's
+                        # only loaded once there are results to chart.
+                        import plotly.express as px
 
-                        # Create bar chart
                         fig = px.bar(
                             df_top_words.head(10),
-                            x='Frequency',
+                            x=weight_column,
                             y='Word',
                             orientation='h',
                             title="Top 10 Most Frequent Words",
-                            color='Frequency',
+                            color=weight_column,
                             color_continuous_scale='viridis'
                         )
                         fig.update_layout(height=500)
@@ -381,50 +687,65 @@ def main():
 
                     # Scraping results
                     scraped_results = result['scraped_results']
-                    successful = sum(1 for _, (_, error) in scraped_results.items() if not error)
+                    successful = sum(1 for details in scraped_results.values() if not details['error'])
                     failed = len(scraped_results) - successful
+                    rendered = sum(1 for details in scraped_results.values() if details['tier'] == 'rendered')
+                    cached = sum(1 for details in scraped_results.values() if details['cached'])
+                    duplicates = sum(1 for details in scraped_results.values() if details['duplicate_of'])
 
-                    col1, col2, col3 = st.columns(3)
+                    col1, col2, col3, col4, col5, col6 = st.columns(6)
                     with col1:
                         st.metric("Total URLs", len(scraped_results))
                     with col2:
                         st.metric("Successful", successful)
                     with col3:
                         st.metric("Failed", failed)
+                    with col4:
+                        st.metric("JS Rendered", rendered)
+                    with col5:
+                        st.metric("From Cache", cached)
+                    with col6:
+                        st.metric("Near-Duplicates", duplicates)
 
                     # Detailed results
                     st.subheader("Detailed Results")
-                    for domain, (text, error) in scraped_results.items():
-                        if error:
-                            st.error(f"❌ {domain}: {error}")
+                    for url, details in scraped_results.items():
+                        tier = details['tier']
+                        tier_text = f" ({tier} HTML{', cached' if details['cached'] else ''})" if tier else ""
+                        if details['error']:
+                            st.error(f"❌ {url}{tier_text}: {details['error']}")
+                        elif details['duplicate_of']:
+                            st.info(f"🔁 {url}{tier_text}: near-duplicate of {details['duplicate_of']}, not counted")
                         else:
-                            st.success(f"✅ {domain}: {len(text)} characters")
+                            st.success(f"✅ {url}{tier_text}: {details['characters']} characters")
 
                 with tab4:
                     st.subheader("Raw Data")
 
-                    # Combined text info
-                    combined_text = result['combined_text']
-                    st.metric("Total Characters", len(combined_text))
-                    st.metric("Total Words", len(combined_text.split()))
+                    # Combined text info. The text itself lives in a temporary file.
+                    st.metric("Total Characters", result['total_characters'])
+                    st.metric("Total Words", result['total_words'])
 
                     # Show sample of combined text
+                    with open(result['text_path'], encoding='utf-8') as text_file:
+                        sample = text_file.read(1001)
                     with st.expander("View Combined Text Sample (first 1000 characters)"):
-                        st.text(combined_text[:1000] + "..." if len(combined_text) > 1000 else combined_text)
+                        st.text(sample[:1000] + "..." if len(sample) > 1000 else sample)
 
                     # Download combined text
-                    st.download_button(
-                        label="📥 Download Combined Text",
-                        data=combined_text,
-                        file_name="combined_job_descriptions.txt",
-                        mime="text/plain"
-                    )
+                    with open(result['text_path'], 'rb') as text_file:
+                        st.download_button(
+                            label="📥 Download Combined Text",
+                            data=text_file,
+                            file_name="combined_job_descriptions.txt",
+                            mime="text/plain"
+                        )
 
                     # Download word frequencies
                     word_freq_df = pd.DataFrame(
-                        result['word_counts'].items(),
-                        columns=['Word', 'Frequency']
-                    ).sort_values('Frequency', ascending=False)
+                        get_top_words(result['word_counts'], len(result['word_counts'])),
+                        columns=['Word', weight_column]
+                    )
 
                     csv_freq = word_freq_df.to_csv(index=False)
                     st.download_button(
@@ -434,24 +755,26 @@ def main():
                         mime="text/csv"
                     )
 
+                if show_diagnostics_tab:
+                    with tab5[0]:
+                        st.subheader("Diagnostics")
+                        show_diagnostics(metrics)
+
             else:
                 st.error(f"❌ {result['message']}")
 
                 # Show partial results if available
                 if result['scraped_results']:
                     st.subheader("Scraping Results")
-                    for domain, (text, error) in result['scraped_results'].items():
-                        if error:
-                            st.error(f"❌ {domain}: {error}")
+                    for url, details in result['scraped_results'].items():
+                        if details['error']:
+                            st.error(f"❌ {url}: {details['error']}")
                         else:
-                            st.success(f"✅ {domain}: {len(text)} characters")
+                            st.success(f"✅ {url}: {details['characters']} characters")
 
         except Exception as e:
             st.error(f"❌ An error occurred: {str(e)}")
             st.exception(e)
 
-    elif generate_button and not urls:
-        st.warning("⚠️ Please enter at least one URL to generate a wordcloud.")
-
 if __name__ == "__main__":
     main()
\ No newline at end of file
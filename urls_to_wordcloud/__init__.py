@@ -1,2 +1,130 @@
-from .scrape_url import *
-from .generate_wordcloud import *
\ No newline at end of file
+"""
+Scrape job postings and turn their descriptions into wordclouds.
+
+Submodules are imported on first use of one of their names (PEP 562), so
+``import urls_to_wordcloud`` stays cheap and doesn't load requests, lxml,
+NLTK, SciPy, wordcloud or pyppeteer until they are needed.
+"""
+import importlib
+import sys
+import types
+
+
+_SUBMODULE_EXPORTS = {
+    'scrape_url': [
+        'HEADERS', 'NOT_FOUND_PHRASES', 'NOT_FOUND_SELECTORS', 'DESCRIPTION_SELECTORS',
+        'STRIPPED_TAGS', 'NOT_FOUND_PATTERN', 'SCRIPT_STYLE_PATTERN', 'MAX_CONCURRENCY',
+        'PER_HOST_LIMIT', 'MIN_DESCRIPTION_LENGTH', 'RENDER_AUTO', 'RENDER_ALWAYS',
+        'RENDER_NEVER', 'RENDER_MODES', 'RENDER_ORDER', 'TIER_STATIC', 'TIER_RENDERED', 'JOB_NOT_FOUND',
+        'RENDER_OPTIONS', 'REQUEST_TIMEOUT', 'SESSION_POOL_SIZE', 'CONNECTIONS_PER_HOST',
+        'MAX_RETRIES', 'BACKOFF_FACTOR', 'RETRY_STATUSES', 'SessionPool', 'get_session_pool',
+        'host_requires_rendering', 'find_not_found_phrase', 'SelectorPlan', 'SELECTOR_PLAN',
+        'extract_job_description', 'scrape_url_details', 'scrape_url', 'iter_scrape_urls',
+        'scrape_urls',
+    ],
+    'generate_wordcloud': [
+        'DOMAIN_STOPWORDS', 'PARALLEL_MIN_TEXTS', 'PARALLEL_BATCH_SIZE', 'NON_WORD_PATTERN',
+        'WORD_PATTERN', 'Preprocessor', 'get_preprocessor', 'preprocess_text', 'NGramIndex',
+        'calculate_word_frequencies', 'stream_word_counts', 'get_top_words',
+        'approximate_top_words', 'generate_wordcloud', 'create_job_descriptions_wordcloud',
+    ],
+    'pipeline': ['TextSink', 'stream_word_frequencies'],
+    'dedupe': [
+        'TRACKING_PARAMS', 'TRACKING_PREFIXES', 'NEAR_DUPLICATE_THRESHOLD', 'SHINGLE_SIZE',
+        'MINHASH_PERMUTATIONS', 'LSH_BANDS', 'MINHASH_SEED', 'is_tracking_param',
+        'canonicalize_url', 'dedupe_urls', 'NearDuplicateIndex',
+    ],
+    'async_scrape': [
+        'ASYNC_MAX_CONCURRENCY', 'ASYNC_MAX_CONNECTIONS', 'BATCH_DEADLINE_EXCEEDED',
+        'create_async_client', 'scrape_url_details_async', 'scrape_url_async',
+        'iter_scrape_urls_async', 'scrape_urls_async', 'iter_scrape_urls_sync', 'scrape_urls_sync',
+    ],
+    'worker_pool': [
+        'WORKER_MEMORY_BUDGET_MB', 'EXTRACT_JOB_TIMEOUT', 'JOBS_PER_WORKER',
+        'MAX_WORKER_MEMORY_MB', 'WORKER_SHUTDOWN_TIMEOUT', 'EXTRACT_WORKERS',
+        'ExtractWorkerError', 'ExtractWorkerPool', 'get_extract_pool',
+    ],
+    'browser_pool': [
+        'BROWSER_POOL_SIZE', 'PAGES_PER_BROWSER', 'MAX_BROWSER_MEMORY_MB', 'RENDER_TIMEOUT',
+        'RENDER_OVERHEAD', 'BROWSER_ARGS', 'BrowserPool', 'get_browser_pool',
+    ],
+    'cache': [
+        'CACHE_PATH', 'CACHE_TTL', 'CACHE_MAX_ENTRIES', 'DEFAULT_PORTS', 'normalize_url',
+        'cache_key', 'PageCache', 'get_page_cache',
+    ],
+    'profiles': [
+        'PROFILES_PATH', 'PROFILE_MAX_MISSES', 'PROFILE_SAVE_INTERVAL', 'DomainProfileStore',
+        'get_profile_store',
+    ],
+    'vectorize': [
+        'WEIGHTING_COUNT', 'WEIGHTING_DOCUMENT_FREQUENCY', 'WEIGHTING_TFIDF', 'WEIGHTINGS',
+        'DocumentTermMatrix', 'calculate_word_weights',
+    ],
+    'topk': ['TopItem', 'SPACE_SAVING_CAPACITY', 'top_k', 'SpaceSaving'],
+    'render': [
+        'PREVIEW_WIDTH', 'PREVIEW_HEIGHT', 'EXPORT_SCALE', 'LAYOUT_CACHE_SIZE',
+        'DEFAULT_COLORMAP', 'DEFAULT_BACKGROUND', 'RELATIVE_SCALING', 'RANDOM_STATE',
+        'LayoutCache', 'layout_wordcloud', 'render_png', 'render_svg',
+    ],
+    'corpus': [
+        'TEXT_SUFFIXES', 'JSONL_SUFFIXES', 'ARCHIVE_SUFFIXES', 'GZIP_SUFFIX',
+        'GLOB_CHARACTERS', 'is_supported', 'expand_paths', 'CorpusReader', 'read_files',
+    ],
+    'nltk_resources': [
+        'NLTK_DATA_PATH', 'NLTK_USER_DATA_PATH', 'NLTK_OFFLINE', 'NLTK_RESOURCES',
+        'ensure_nltk_resource', 'english_stopwords', 'download_nltk_data',
+    ],
+    'metrics': [
+        'METRICS_ENABLED', 'METRICS_TEXTFILE', 'METRICS_LOG', 'METRICS_PREFIX', 'Metrics',
+        'LogSink', 'PrometheusTextfileSink', 'get_metrics',
+    ],
+}
+
+_EXPORTS = {name: module for module, names in _SUBMODULE_EXPORTS.items() for name in names}
+
+__all__ = list(_EXPORTS)
+
+
+class _Package(types.ModuleType):
+    """
+    The package's module type. Importing a submodule sets the package
+    attribute of the same name to the module, which would shadow the
+    ``scrape_url`` and ``generate_wordcloud`` functions; the export is kept
+    instead, as the star imports this package used to do would.
+    """
+
+    def __setattr__(self, name, value):
+        if (isinstance(value, types.ModuleType) and _EXPORTS.get(name) == name
+                and value.__name__ == f'{__name__}.{name}'):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
+
+
+def _bind_loaded_exports():
+    """
+    Copy the exports of every loaded submodule into the package namespace,
+    as ``from .module import *`` would, so __getattr__ runs once per name.
+    """
+    namespace = globals()
+    for module, names in _SUBMODULE_EXPORTS.items():
+        loaded = sys.modules.get(f'{__name__}.{module}')
+        if loaded is not None:
+            for export in names:
+                namespace[export] = getattr(loaded, export)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    importlib.import_module(f'.{module}', __name__)
+    _bind_loaded_exports()
+    return globals()[name]
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
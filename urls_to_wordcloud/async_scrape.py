@@ -0,0 +1,402 @@
+import asyncio
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+import httpx
+
+from .metrics import get_metrics
+from .scrape_url import (
+    BACKOFF_FACTOR, BODY_CHUNK_SIZE, HEADERS, MAX_BODY_BYTES, MAX_RETRIES, PER_HOST_LIMIT,
+    RENDER_AUTO, RENDER_MODES, RENDER_OPTIONS, REQUEST_TIMEOUT, RETRY_STATUSES,
+    _content_type_error, _decode_body, _extract_rendered, _extract_static, _lookup_cache,
+    _new_details, _resolve_shared, _settle_page, _store_result, _validator_headers
+)
+
+logger = logging.getLogger('urls_to_wordcloud.async_scrape')
+
+
+# Fetches in flight across a batch. Each is a coroutine rather than a
+# thread, so this can be much higher than MAX_CONCURRENCY.
+ASYNC_MAX_CONCURRENCY = 64
+# Connections the client keeps open across all hosts
+ASYNC_MAX_CONNECTIONS = 100
+# Error for URLs a batch deadline cut off
+BATCH_DEADLINE_EXCEEDED = "Batch deadline exceeded"
+
+
+def create_async_client(max_connections=ASYNC_MAX_CONNECTIONS):
+    """
+    Return an ``httpx.AsyncClient`` set up like the sync ``SessionPool``:
+    the browser-like ``HEADERS``, ``REQUEST_TIMEOUT`` and connection
+    retries. Close it with ``await client.aclose()`` or ``async with``.
+    """
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        timeout=REQUEST_TIMEOUT,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=max_connections),
+        transport=httpx.AsyncHTTPTransport(retries=MAX_RETRIES),
+    )
+
+
+def _retry_after(response):
+    try:
+        return max(0.0, float(response.headers.get('Retry-After', '')))
+    except ValueError:
+        return None
+
+
+async def _send(client, url, headers):
+    """
+    Send a streamed GET, retrying 429/5xx responses with exponential
+    backoff (or after ``Retry-After``) like the ``SessionPool``'s urllib3
+    retries. The caller must close the returned response.
+    """
+    request = client.build_request('GET', url, headers=headers)
+    for attempt in range(MAX_RETRIES + 1):
+        response = await client.send(request, stream=True)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+
+        await response.aclose()
+        delay = _retry_after(response)
+        await asyncio.sleep(BACKOFF_FACTOR * 2 ** attempt if delay is None else delay)
+
+
+async def _read_body(response, max_bytes):
+    """
+    Read a streamed ``httpx`` response up to ``max_bytes`` and close it.
+    Returns ``(body, truncated)``.
+    """
+    chunks = []
+    size = 0
+    truncated = False
+    try:
+        async for chunk in response.aiter_bytes(BODY_CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                truncated = True
+                break
+    finally:
+        await response.aclose()
+    return b''.join(chunks)[:max_bytes], truncated
+
+
+async def _fetch_page(client, url, entry, max_body_bytes, metrics, domain):
+    """
+    Fetch a page like the sync ``_fetch_page``: None when the stale cache
+    ``entry`` is still valid, or ``(html, error, headers)``.
+    """
+    with metrics.timer('fetch', domain=domain):
+        response = await _send(client, url, _validator_headers(entry))
+        if entry and response.status_code == 304:
+            await response.aclose()
+            return None
+        if response.status_code >= 400:
+            await response.aclose()
+        response.raise_for_status()
+
+        error = _content_type_error(response.headers)
+        if error:
+            await response.aclose()
+            return "", error, response.headers
+        body, truncated = await _read_body(response, max_body_bytes)
+
+    if truncated:
+        logger.warning("Response from %s is larger than %d bytes; using the first %d",
+                       url, max_body_bytes, max_body_bytes)
+        metrics.increment('truncated_bodies', domain=domain)
+    metrics.increment('bytes_fetched', len(body), domain=domain)
+    return _decode_body(body, response.headers), "", response.headers
+
+
+async def _with_cache(cache, func, *args):
+    """Call a cache helper, on a thread if it will touch the (SQLite) cache."""
+    if cache is None:
+        return func(*args)
+    return await asyncio.to_thread(func, *args)
+
+
+def _timed_thread(func, *args):
+    """Call ``func`` and return its result with the CPU seconds it took on this thread."""
+    started = time.thread_time()
+    result = func(*args)
+    return result, time.thread_time() - started
+
+
+async def scrape_url_details_async(url, client=None, render=RENDER_AUTO, browser_pool=None,
+                                   cache=None, profiles=None, executor=None,
+                                   max_body_bytes=MAX_BODY_BYTES, extract_pool=None):
+    """
+    Scrape a URL without blocking the event loop, and return the same dict
+    as ``scrape_url_details``.
+
+    The page is fetched with ``client`` (a new ``create_async_client`` for
+    this call if not given; pass one in to share connections), parsing and
+    selection run on ``executor`` (the loop's default thread pool if None),
+    and rendering is awaited on the browser pool. With an ``extract_pool``,
+    parsing and rendering are awaited on its worker processes instead.
+    ``render``, ``browser_pool``, ``cache``, ``profiles``, ``max_body_bytes``
+    and ``extract_pool`` work as in ``scrape_url_details``.
+    """
+    if render not in RENDER_MODES:
+        raise ValueError(f"render must be one of {RENDER_MODES}, got {render!r}")
+
+    if client is None:
+        async with create_async_client() as client:
+            return await scrape_url_details_async(url, client, render, browser_pool, cache,
+                                                  profiles, executor, max_body_bytes,
+                                                  extract_pool)
+
+    browser_pool, cache, profiles = _resolve_shared(browser_pool, cache, profiles)
+    loop = asyncio.get_running_loop()
+
+    result = _new_details(url)
+    metrics = get_metrics()
+    domain = urlparse(url).netloc.lower() if metrics.enabled else None
+
+    entry, fetch = await _with_cache(cache, _lookup_cache, cache, url, metrics, domain)
+    page = None
+    if fetch:
+        try:
+            page = await _fetch_page(client, url, entry, max_body_bytes, metrics, domain)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Error fetching URL %s: %s", url, e)
+            metrics.increment('fetch_errors', domain=domain)
+            result['error'] = e
+            return result
+
+    source = await _with_cache(cache, _settle_page, result, url, entry, page, render, cache,
+                               metrics, domain)
+    if source is None:
+        return result
+    html = source[0]
+
+    if extract_pool is not None:
+        try:
+            text, error, tier, render_failed, parse_cpu = await extract_pool.extract_async(
+                url, html, render, profiles=profiles
+            )
+        except Exception as e:
+            logger.warning("Error extracting %s: %s", url, e)
+            metrics.increment('extract_failures', domain=domain)
+            result['error'] = e
+            return result
+        extracted = (text, error, tier, render_failed)
+    else:
+        (extracted, state), parse_cpu = await loop.run_in_executor(
+            executor, _timed_thread, _extract_static, url, html, render, profiles
+        )
+
+    if extracted is None:
+        rendered_html = render_error = None
+        try:
+            with metrics.timer('render', domain=state['host']):
+                rendered_html = await browser_pool.render_async(url, **RENDER_OPTIONS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            render_error = e
+
+        extracted, rendered_cpu = await loop.run_in_executor(
+            executor, _timed_thread, _extract_rendered, url, html, rendered_html, render_error,
+            profiles, state
+        )
+        parse_cpu += rendered_cpu
+
+    result['text'], result['error'], result['tier'], render_failed = extracted
+    result['parse_cpu'] = parse_cpu
+    metrics.observe('parse_cpu', parse_cpu, domain=domain)
+
+    await _with_cache(cache, _store_result, cache, url, result, source, render, render_failed)
+    return result
+
+
+async def scrape_url_async(url, client=None, render=RENDER_AUTO, browser_pool=None, cache=None,
+                           profiles=None, executor=None, max_body_bytes=MAX_BODY_BYTES,
+                           extract_pool=None):
+    """
+    Scrape a URL and return the job description as a ``(text, error)``
+    tuple. See ``scrape_url_details_async`` for the options.
+    """
+    result = await scrape_url_details_async(url, client=client, render=render,
+                                            browser_pool=browser_pool, cache=cache,
+                                            profiles=profiles, executor=executor,
+                                            max_body_bytes=max_body_bytes,
+                                            extract_pool=extract_pool)
+    return (result['text'], result['error'])
+
+
+async def iter_scrape_urls_async(urls, max_concurrency=ASYNC_MAX_CONCURRENCY,
+                                 per_host_limit=PER_HOST_LIMIT, deadline=None, client=None,
+                                 render=RENDER_AUTO, browser_pool=None, cache=None,
+                                 profiles=None, executor=None, max_body_bytes=MAX_BODY_BYTES,
+                                 extract_pool=None):
+    """
+    Scrape URLs concurrently on the running event loop and yield
+    ``(position, details)`` pairs as each one finishes, like
+    ``iter_scrape_urls``.
+
+    At most ``max_concurrency`` URLs are scraped at once, and at most
+    ``per_host_limit`` against any single host. Only about twice
+    ``max_concurrency`` URLs are taken from ``urls`` at a time, so it may
+    be a lazy iterable.
+
+    ``deadline`` bounds the whole batch in seconds. When it passes, URLs
+    still in flight are cancelled, and they and any URLs not started yet
+    are yielded with a ``TimeoutError`` as their error. Closing the
+    generator or cancelling the task consuming it cancels everything in
+    flight. Extraction already running on ``executor`` threads finishes
+    in the background, and its result is dropped.
+
+    Without a ``client``, one is created for the batch and closed after it.
+    """
+    loop = asyncio.get_running_loop()
+    deadline_at = loop.time() + deadline if deadline is not None else None
+    own_client = client is None
+    if own_client:
+        client = create_async_client()
+
+    global_slots = asyncio.Semaphore(max(1, max_concurrency))
+    host_slots = {}
+    started_at = {}
+
+    async def scrape_one(position, url):
+        host = urlparse(url).netloc.lower()
+        if host not in host_slots:
+            host_slots[host] = asyncio.Semaphore(per_host_limit)
+
+        # Wait for the host before taking a global slot, so a busy host doesn't hold slots idle
+        async with host_slots[host], global_slots:
+            started_at[position] = time.perf_counter()
+            try:
+                details = await scrape_url_details_async(url, client=client, render=render,
+                                                         browser_pool=browser_pool, cache=cache,
+                                                         profiles=profiles, executor=executor,
+                                                         max_body_bytes=max_body_bytes,
+                                                         extract_pool=extract_pool)
+            except Exception as e:
+                logger.warning("Error scraping URL %s: %s", url, e)
+                details = _new_details(url, error=e)
+            details['elapsed'] = time.perf_counter() - started_at[position]
+            return details
+
+    def timed_out(position, url):
+        details = _new_details(url, error=TimeoutError(BATCH_DEADLINE_EXCEEDED))
+        details['elapsed'] = time.perf_counter() - started_at.get(position, time.perf_counter())
+        return details
+
+    queue_size = max(1, max_concurrency) * 2
+    pending = {}
+    url_iter = enumerate(urls)
+
+    def submit_more():
+        while len(pending) < queue_size:
+            try:
+                position, url = next(url_iter)
+            except StopIteration:
+                return
+            pending[loop.create_task(scrape_one(position, url))] = (position, url)
+
+    try:
+        submit_more()
+        while pending:
+            timeout = None if deadline_at is None else max(0.0, deadline_at - loop.time())
+            done, _ = await asyncio.wait(pending, timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # Out of time: report everything left as timed out, without starting it
+                for task, (position, url) in list(pending.items()):
+                    task.cancel()
+                    yield position, timed_out(position, url)
+                for position, url in url_iter:
+                    yield position, timed_out(position, url)
+                return
+
+            for task in done:
+                position, _ = pending.pop(task)
+                submit_more()
+                yield position, task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if own_client:
+            await client.aclose()
+
+
+async def scrape_urls_async(urls, max_concurrency=ASYNC_MAX_CONCURRENCY,
+                            per_host_limit=PER_HOST_LIMIT, deadline=None, details=False,
+                            client=None, render=RENDER_AUTO, browser_pool=None, cache=None,
+                            profiles=None, executor=None, max_body_bytes=MAX_BODY_BYTES,
+                            extract_pool=None):
+    """
+    Scrape several URLs concurrently and return their results in the same
+    order as ``urls``: ``(text, error)`` tuples, or ``scrape_url_details``
+    dicts if ``details`` is set. See ``iter_scrape_urls_async``.
+    """
+    urls = list(urls)
+    results = [None] * len(urls)
+
+    async for position, result in iter_scrape_urls_async(
+            urls, max_concurrency=max_concurrency, per_host_limit=per_host_limit,
+            deadline=deadline, client=client, render=render, browser_pool=browser_pool,
+            cache=cache, profiles=profiles, executor=executor,
+            max_body_bytes=max_body_bytes, extract_pool=extract_pool):
+        results[position] = result if details else (result['text'], result['error'])
+
+    return results
+
+
+def iter_scrape_urls_sync(urls, **options):
+    """
+    A blocking generator over ``iter_scrape_urls_async``, for callers
+    without an event loop of their own (or inside one they can't block,
+    like a notebook's).
+
+    The batch runs on a private event loop in a background thread, and each
+    result is only produced when the caller asks for the next one, so the
+    scrape never runs far ahead of its consumer. Closing the generator early
+    cancels the URLs in flight. ``options`` are passed to
+    ``iter_scrape_urls_async``.
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name='async-scrape', daemon=True)
+    thread.start()
+
+    async def start():
+        return iter_scrape_urls_async(urls, **options)
+
+    results = asyncio.run_coroutine_threadsafe(start(), loop).result()
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(results.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+    finally:
+        asyncio.run_coroutine_threadsafe(results.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def scrape_urls_sync(urls, details=False, **options):
+    """
+    Blocking ``scrape_urls_async``: scrape several URLs on a private event
+    loop and return their results in the same order as ``urls``.
+    """
+    urls = list(urls)
+    results = [None] * len(urls)
+
+    for position, result in iter_scrape_urls_sync(urls, **options):
+        results[position] = result if details else (result['text'], result['error'])
+
+    return results
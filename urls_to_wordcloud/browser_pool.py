@@ -0,0 +1,323 @@
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import os
+import threading
+
+
+logger = logging.getLogger('urls_to_wordcloud.browser_pool')
+
+BROWSER_POOL_SIZE = 2
+PAGES_PER_BROWSER = 50
+MAX_BROWSER_MEMORY_MB = 1024
+RENDER_TIMEOUT = 10
+# Seconds a render may take beyond its page-load timeout and pauses, for
+# launching a browser, opening the tab and reading the page back. Callers
+# wait this much longer again for the render to be torn down.
+RENDER_OVERHEAD = 15
+
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-gpu',
+    '--disable-dev-shm-usage',
+    '--disable-extensions',
+    '--mute-audio',
+]
+
+
+def _process_tree_rss_mb(pid):
+    """
+    Return the resident memory of a process and its children in MB, or None
+    if it cannot be read (e.g. no /proc on this platform).
+    """
+    try:
+        parents = {}
+        rss_pages = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    stat = f.read()
+            except OSError:
+                continue
+            # The command name may contain spaces, so split after its closing paren
+            fields = stat[stat.rindex(')') + 2:].split()
+            parents[int(entry)] = int(fields[1])
+            rss_pages[int(entry)] = int(fields[21])
+    except (OSError, ValueError, IndexError):
+        return None
+
+    if pid not in rss_pages:
+        return None
+
+    tree = {pid}
+    changed = True
+    while changed:
+        changed = False
+        for child, parent in parents.items():
+            if parent in tree and child not in tree:
+                tree.add(child)
+                changed = True
+
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    return sum(rss_pages[p] for p in tree) * page_size / (1024 * 1024)
+
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages_rendered = 0
+
+    def is_alive(self):
+        process = getattr(self.browser, 'process', None)
+        return process is None or process.poll() is None
+
+    def memory_mb(self):
+        process = getattr(self.browser, 'process', None)
+        if process is None:
+            return None
+        return _process_tree_rss_mb(process.pid)
+
+
+class BrowserPool:
+    """
+    A long-lived, bounded pool of headless Chromium browsers for rendering.
+
+    Browsers are launched on first use and reused across pages, so rendering
+    costs a new tab rather than a browser startup. At most ``size`` pages
+    render at once. A browser is recycled after ``pages_per_browser`` pages,
+    when it crashes, or when its process tree uses more than
+    ``max_memory_mb`` of memory.
+
+    The browsers run on a private event loop in a background thread, so
+    ``render`` can be called from any thread. Use the pool as a context
+    manager or call ``close()`` when done.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, pages_per_browser=PAGES_PER_BROWSER,
+                 max_memory_mb=MAX_BROWSER_MEMORY_MB, launch_args=None):
+        self.size = max(1, size)
+        self.pages_per_browser = pages_per_browser
+        self.max_memory_mb = max_memory_mb
+        self.launch_args = list(launch_args if launch_args is not None else BROWSER_ARGS)
+
+        self._loop = None
+        self._thread = None
+        self._slots = None
+        self._idle = []
+        self._busy = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BrowserPool is closed")
+            if self._loop is not None:
+                return
+
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._loop.run_forever,
+                name='browser-pool',
+                daemon=True
+            )
+            self._thread.start()
+            self._slots = asyncio.run_coroutine_threadsafe(
+                self._create_slots(), self._loop
+            ).result()
+
+    async def _create_slots(self):
+        return asyncio.Semaphore(self.size)
+
+    async def _launch(self):
+        # pyppeteer is slow to import and only needed once a page must be rendered
+        import pyppeteer
+
+        browser = await pyppeteer.launch(
+            headless=True,
+            args=self.launch_args,
+            # Signal handlers can only be installed from the main thread
+            handleSIGINT=False,
+            handleSIGTERM=False,
+            handleSIGHUP=False
+        )
+        return _PooledBrowser(browser)
+
+    async def _close_browser(self, pooled):
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.warning("Error closing browser: %s", e)
+
+    async def _acquire(self):
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                pooled = self._idle.pop()
+                if pooled.is_alive():
+                    break
+                await self._close_browser(pooled)
+            else:
+                pooled = await self._launch()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        self._busy.add(pooled)
+        return pooled
+
+    async def _release(self, pooled, healthy):
+        self._busy.discard(pooled)
+        pooled.pages_rendered += 1
+
+        recycle = (
+            not healthy
+            or self._closed
+            or not pooled.is_alive()
+            or pooled.pages_rendered >= self.pages_per_browser
+        )
+        if not recycle and self.max_memory_mb:
+            memory = pooled.memory_mb()
+            recycle = memory is not None and memory > self.max_memory_mb
+
+        if recycle:
+            await self._close_browser(pooled)
+        else:
+            self._idle.append(pooled)
+        self._slots.release()
+
+    async def _render(self, url, timeout, sleep, scrolldown, user_agent):
+        from pyppeteer.errors import TimeoutError as PageTimeoutError
+
+        pooled = await self._acquire()
+        page = None
+        healthy = True
+
+        try:
+            page = await pooled.browser.newPage()
+            if user_agent:
+                await page.setUserAgent(user_agent)
+            await page.goto(url, options={'timeout': int(timeout * 1000)})
+
+            if scrolldown:
+                for _ in range(scrolldown):
+                    await page.keyboard.press('PageDown')
+                    await asyncio.sleep(sleep)
+            elif sleep:
+                await asyncio.sleep(sleep)
+
+            return await page.content()
+        except PageTimeoutError:
+            # A slow page doesn't mean the browser is broken
+            raise
+        except (Exception, asyncio.CancelledError):
+            # Including a render cut off by its deadline, which may have hung the browser
+            healthy = False
+            raise
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    healthy = False
+            await self._release(pooled, healthy)
+
+    async def _render_within(self, deadline, url, timeout, sleep, scrolldown, user_agent):
+        try:
+            return await asyncio.wait_for(
+                self._render(url, timeout, sleep, scrolldown, user_agent), deadline
+            )
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Rendering {url} took longer than {deadline:g}s") from None
+
+    def _submit(self, url, timeout, sleep, scrolldown, user_agent):
+        """Start a render on the pool's loop; returns its future and deadline in seconds."""
+        self._ensure_started()
+        deadline = timeout + sleep * max(scrolldown, 1) + RENDER_OVERHEAD
+        future = asyncio.run_coroutine_threadsafe(
+            self._render_within(deadline, url, timeout, sleep, scrolldown, user_agent),
+            self._loop
+        )
+        return future, deadline
+
+    def render(self, url, timeout=RENDER_TIMEOUT, sleep=1, scrolldown=1, user_agent=None):
+        """
+        Load a URL in a pooled browser and return the rendered HTML.
+
+        ``timeout`` bounds the page load in seconds; ``scrolldown`` presses
+        PageDown that many times, pausing ``sleep`` seconds after each. The
+        whole render, including launching a browser and opening the tab, is
+        cut off after those plus ``RENDER_OVERHEAD`` seconds with a
+        ``TimeoutError``, and its browser is recycled.
+        """
+        future, deadline = self._submit(url, timeout, sleep, scrolldown, user_agent)
+        try:
+            return future.result(timeout=deadline + RENDER_OVERHEAD)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Rendering {url} took longer than {deadline:g}s") from None
+
+    async def render_async(self, url, timeout=RENDER_TIMEOUT, sleep=1, scrolldown=1,
+                           user_agent=None):
+        """
+        Like ``render``, but awaitable from any event loop. Cancelling the
+        awaiting task cancels the render and closes its tab.
+        """
+        future, deadline = self._submit(url, timeout, sleep, scrolldown, user_agent)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future),
+                                          deadline + RENDER_OVERHEAD)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Rendering {url} took longer than {deadline:g}s") from None
+
+    async def _shutdown(self):
+        browsers = self._idle + list(self._busy)
+        self._idle = []
+        self._busy = set()
+        for pooled in browsers:
+            await self._close_browser(pooled)
+
+    def close(self):
+        """Close every browser and stop the pool's event loop."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            loop, thread = self._loop, self._thread
+
+        if loop is None:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=30)
+        except Exception as e:
+            logger.warning("Error shutting down browser pool: %s", e)
+
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        if not thread.is_alive():
+            loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_default_browser_pool = None
+_default_browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """Return the process-wide browser pool, creating it on first use."""
+    global _default_browser_pool
+
+    with _default_browser_pool_lock:
+        if _default_browser_pool is None:
+            _default_browser_pool = BrowserPool()
+            atexit.register(_default_browser_pool.close)
+        return _default_browser_pool
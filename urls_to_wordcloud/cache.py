@@ -0,0 +1,219 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+CACHE_PATH = os.environ.get(
+    'JD_WORDCLOUD_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'jd-wordcloud', 'pages.sqlite3')
+)
+CACHE_TTL = 24 * 60 * 60
+CACHE_MAX_ENTRIES = 5000
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """
+    Normalize a URL for use as a cache key.
+
+    Lowercases the scheme and host, drops default ports and the fragment,
+    and sorts the query parameters by name. Repeated parameters keep their
+    order, since ``?a=2&a=1`` may not mean the same as ``?a=1&a=2``.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or '').lower()
+
+    # IPv6 addresses keep their brackets
+    if ':' in netloc:
+        netloc = f"[{netloc}]"
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo = f"{userinfo}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    query = urlencode(sorted(params, key=lambda param: param[0]))
+    return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+
+def cache_key(url):
+    """Return the content address of a URL: the SHA-256 of its normalized form."""
+    return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+
+class PageCache:
+    """
+    An on-disk SQLite cache of fetched pages and extracted descriptions.
+
+    Entries are keyed by the SHA-256 of the normalized URL and hold the
+    zlib-compressed raw HTML, the extracted description, the error string,
+    the render mode it was extracted with, the fetch time and the response's
+    ``ETag``/``Last-Modified`` validators.
+
+    Entries younger than ``ttl`` seconds are served as-is. Older entries with
+    validators can be revalidated with a conditional request; older entries
+    without them are dropped. Beyond ``max_entries`` the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    html BLOB,
+                    description TEXT NOT NULL DEFAULT '',
+                    error TEXT NOT NULL DEFAULT '',
+                    tier TEXT,
+                    render TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)"
+            )
+            # Caches written before the render mode was stored
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pages)")}
+            if 'render' not in columns:
+                self._conn.execute("ALTER TABLE pages ADD COLUMN render TEXT")
+
+    def get(self, url):
+        """
+        Return the cached entry for a URL as a dict, or None.
+
+        The dict has ``url``, ``html``, ``description``, ``error``, ``tier``,
+        ``render``, ``etag``, ``last_modified``, ``fetched_at`` and ``fresh``
+        keys.
+        Entries that are stale and cannot be revalidated are not returned.
+        """
+        key = cache_key(url)
+        now = time.time()
+
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT url, html, description, error, tier, etag, last_modified, fetched_at, "
+                "render FROM pages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            fresh = now - row[7] < self.ttl
+            if not fresh and not (row[5] or row[6]):
+                self._conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+                return None
+
+            self._conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (now, key))
+
+        return {
+            'url': row[0],
+            'html': zlib.decompress(row[1]).decode('utf-8') if row[1] else '',
+            'description': row[2],
+            'error': row[3],
+            'tier': row[4],
+            'render': row[8],
+            'etag': row[5],
+            'last_modified': row[6],
+            'fetched_at': row[7],
+            'fresh': fresh,
+        }
+
+    def put(self, url, html, description, error, tier=None, etag=None, last_modified=None,
+            render=None, fetched_at=None):
+        """
+        Store a fetched page and what was extracted from it with the
+        ``render`` mode. ``fetched_at`` defaults to now; pass the original
+        fetch time when re-extracting a page that is already cached.
+        """
+        now = time.time()
+        compressed = zlib.compress(html.encode('utf-8')) if html else None
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(key, url, html, description, error, tier, render, etag, last_modified, "
+                "fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(url), normalize_url(url), compressed, description or '',
+                 str(error) if error else '', tier, render, etag, last_modified,
+                 now if fetched_at is None else fetched_at, now)
+            )
+            self._evict()
+
+    def revalidated(self, url):
+        """Mark an entry as fresh again after a ``304 Not Modified`` response."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, cache_key(url))
+            )
+
+    def _evict(self):
+        # Stale entries without validators can never be served again
+        self._conn.execute(
+            "DELETE FROM pages WHERE fetched_at < ? AND etag IS NULL AND last_modified IS NULL",
+            (time.time() - self.ttl,)
+        )
+        if self.max_entries:
+            self._conn.execute(
+                "DELETE FROM pages WHERE key NOT IN "
+                "(SELECT key FROM pages ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_default_page_cache = None
+_default_page_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """Return the process-wide page cache, creating it on first use."""
+    global _default_page_cache
+
+    with _default_page_cache_lock:
+        if _default_page_cache is None:
+            _default_page_cache = PageCache()
+            atexit.register(_default_page_cache.close)
+        return _default_page_cache
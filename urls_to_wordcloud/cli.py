@@ -0,0 +1,172 @@
+import argparse
+import csv
+import sys
+import time
+
+from .corpus import CorpusReader
+from .generate_wordcloud import (
+    DOMAIN_STOPWORDS, PARALLEL_BATCH_SIZE, Preprocessor, get_top_words, stream_word_counts
+)
+from .metrics import get_metrics
+from .render import DEFAULT_COLORMAP, EXPORT_SCALE, render_png, render_svg
+from .vectorize import WEIGHTING_COUNT, WEIGHTING_TFIDF, DocumentTermMatrix
+
+
+# Print a progress line every this many documents
+PROGRESS_INTERVAL = 10_000
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m urls_to_wordcloud',
+        description="Count words in a corpus of job descriptions and write a wordcloud "
+                    "and frequency tables, without a display."
+    )
+    parser.add_argument(
+        'inputs', nargs='+',
+        help="Files, directories or glob patterns of .txt, .jsonl, .gz or .zip files"
+    )
+
+    reading = parser.add_argument_group('input')
+    reading.add_argument('--lines', action='store_true',
+                         help="Treat each line of a text file as one document")
+    reading.add_argument('--text-field', default='text',
+                         help="JSONL field holding the document text (default: text)")
+
+    counting = parser.add_argument_group('counting')
+    counting.add_argument('-n', '--n-gram-size', type=int, choices=[1, 2, 3], default=1)
+    counting.add_argument('--min-frequency', type=int, default=2)
+    counting.add_argument('--weighting', choices=[WEIGHTING_COUNT, WEIGHTING_TFIDF],
+                          default=WEIGHTING_COUNT,
+                          help="Raw counts, or TF-IDF to down-weight boilerplate (serial only)")
+    counting.add_argument('--workers', type=int, default=1,
+                          help="Counting processes; 0 for one per CPU (default: 1)")
+    counting.add_argument('--batch-size', type=int, default=PARALLEL_BATCH_SIZE,
+                          help="Documents per counting task")
+    counting.add_argument('--stopwords', default='',
+                          help="Comma-separated extra words to leave out")
+    counting.add_argument('--ignore-common-words', action='store_true',
+                          help="Leave out words like 'experience' and 'team'")
+    counting.add_argument('--nltk-tokenizer', action='store_true',
+                          help="Use NLTK's tokenizer instead of the faster regex")
+
+    output = parser.add_argument_group('output')
+    output.add_argument('--png', help="Write the wordcloud as a PNG")
+    output.add_argument('--svg', help="Write the wordcloud as an SVG")
+    output.add_argument('--csv', help="Write all word frequencies as CSV")
+    output.add_argument('--parquet', help="Write all word frequencies as Parquet (needs pyarrow)")
+    output.add_argument('--max-words', type=int, default=50)
+    output.add_argument('--scale', type=int, default=EXPORT_SCALE,
+                        help=f"Image scale over the 600x400 layout (default: {EXPORT_SCALE})")
+    output.add_argument('--colormap', default=DEFAULT_COLORMAP)
+    output.add_argument('--top', type=int, default=20,
+                        help="Print this many top words (default: 20)")
+    output.add_argument('-q', '--quiet', action='store_true', help="Only print errors")
+
+    return parser
+
+
+class _Progress:
+    """Wraps a CorpusReader and prints throughput every PROGRESS_INTERVAL documents."""
+
+    def __init__(self, reader, started, quiet):
+        self.reader = reader
+        self.started = started
+        self.quiet = quiet
+
+    def __iter__(self):
+        for text in self.reader:
+            yield text
+            if not self.quiet and self.reader.documents % PROGRESS_INTERVAL == 0:
+                print(_throughput(self.reader, time.perf_counter() - self.started), file=sys.stderr)
+
+
+def _throughput(reader, elapsed):
+    megabytes = reader.bytes / (1024 * 1024)
+    elapsed = max(elapsed, 1e-9)
+    return (f"{reader.documents} documents ({megabytes:.1f} MB) from {reader.files} files "
+            f"in {elapsed:.1f}s: {reader.documents / elapsed:.0f} docs/sec, "
+            f"{megabytes / elapsed:.2f} MB/sec")
+
+
+def write_csv(path, top_words, value_column):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Word', value_column])
+        writer.writerows(top_words)
+
+
+def write_parquet(path, top_words, value_column):
+    import pandas as pd
+
+    pd.DataFrame(top_words, columns=['Word', value_column]).to_parquet(path, index=False)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    extra_stopwords = {word.strip().lower() for word in args.stopwords.split(',') if word.strip()}
+    if args.ignore_common_words:
+        extra_stopwords |= DOMAIN_STOPWORDS
+    preprocessor = Preprocessor(extra_stopwords=extra_stopwords, fast=not args.nltk_tokenizer)
+
+    reader = CorpusReader(args.inputs, lines=args.lines, text_field=args.text_field)
+    started = time.perf_counter()
+    texts = _Progress(reader, started, args.quiet)
+
+    if args.weighting == WEIGHTING_COUNT:
+        word_counts = stream_word_counts(texts, args.n_gram_size, preprocessor,
+                                         workers=args.workers or None,
+                                         batch_size=args.batch_size)
+        word_counts = {word: count for word, count in word_counts.items()
+                       if count >= args.min_frequency}
+        value_column = 'Frequency'
+    else:
+        matrix = DocumentTermMatrix.from_texts(texts, args.n_gram_size, preprocessor)
+        word_counts = matrix.to_dict(args.weighting, args.min_frequency)
+        value_column = 'Weight'
+    counted = time.perf_counter() - started
+
+    if not args.quiet:
+        print(_throughput(reader, counted))
+        print(f"{len(word_counts)} unique {args.n_gram_size}-grams with "
+              f"frequency >= {args.min_frequency}")
+
+    if not reader.documents:
+        print("No documents found.", file=sys.stderr)
+        return 1
+
+    top_words = get_top_words(word_counts, len(word_counts))
+
+    if not args.quiet and args.top:
+        for word, value in top_words[:args.top]:
+            print(f"{value:>12,}  {word}" if isinstance(value, int) else f"{value:>12.4f}  {word}")
+
+    if args.csv:
+        write_csv(args.csv, top_words, value_column)
+    if args.parquet:
+        try:
+            write_parquet(args.parquet, top_words, value_column)
+        except ImportError as e:
+            print(f"Could not write Parquet ({e}); install pandas and pyarrow", file=sys.stderr)
+            return 1
+
+    if word_counts and (args.png or args.svg):
+        rendering = time.perf_counter()
+        if args.png:
+            with open(args.png, 'wb') as f:
+                f.write(render_png(word_counts, args.max_words, scale=args.scale,
+                                   colormap=args.colormap, optimize=True))
+        if args.svg:
+            with open(args.svg, 'w', encoding='utf-8') as f:
+                f.write(render_svg(word_counts, args.max_words, scale=args.scale,
+                                   colormap=args.colormap))
+        if not args.quiet:
+            print(f"Rendered wordcloud in {time.perf_counter() - rendering:.2f}s")
+
+    get_metrics().flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
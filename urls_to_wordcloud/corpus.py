@@ -0,0 +1,149 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import zipfile
+
+
+TEXT_SUFFIXES = ('.txt', '.text')
+JSONL_SUFFIXES = ('.jsonl', '.ndjson')
+ARCHIVE_SUFFIXES = ('.zip',)
+GZIP_SUFFIX = '.gz'
+
+GLOB_CHARACTERS = frozenset('*?[')
+
+logger = logging.getLogger('urls_to_wordcloud.corpus')
+
+
+def _base_name(name):
+    """Return a file name, lowercased and without a trailing .gz."""
+    name = name.lower()
+    return name[:-len(GZIP_SUFFIX)] if name.endswith(GZIP_SUFFIX) else name
+
+
+def is_supported(name):
+    """Return True if ``name`` looks like a text, JSONL or zip corpus file."""
+    base = _base_name(name)
+    if base.endswith(ARCHIVE_SUFFIXES):
+        return not name.lower().endswith(GZIP_SUFFIX)
+    return base.endswith(TEXT_SUFFIXES + JSONL_SUFFIXES)
+
+
+def expand_paths(paths):
+    """
+    Expand files, directories (recursively) and glob patterns into a sorted,
+    de-duplicated list of supported corpus files.
+    """
+    files = []
+    for path in paths:
+        if GLOB_CHARACTERS & set(path):
+            matches = sorted(glob.glob(path, recursive=True))
+        else:
+            matches = [path]
+
+        for match in matches:
+            if os.path.isdir(match):
+                for directory, subdirectories, names in os.walk(match):
+                    subdirectories.sort()
+                    files.extend(os.path.join(directory, name)
+                                 for name in sorted(names) if is_supported(name))
+            elif os.path.isfile(match):
+                files.append(match)
+            else:
+                logger.warning("No such file or directory: %s", match)
+
+    return list(dict.fromkeys(files))
+
+
+class CorpusReader:
+    """
+    Streams documents from files, directories, glob patterns and archives.
+
+    Plain ``.txt`` files are one document each, or one document per line
+    with ``lines`` set (the format ``TextSink`` writes). ``.jsonl`` files
+    hold one JSON record per line, with the text under ``text_field``. Any
+    of these may be gzip-compressed (``.gz``) or inside a ``.zip`` archive.
+
+    Files are read in binary and decoded as they stream, so nothing but the
+    current document is held in memory. ``documents`` and ``bytes`` count
+    what has been read so far (uncompressed), for throughput reporting.
+    """
+
+    def __init__(self, paths, lines=False, text_field='text'):
+        if isinstance(paths, str):
+            paths = [paths]
+        self.paths = list(paths)
+        self.lines = lines
+        self.text_field = text_field
+        self.documents = 0
+        self.bytes = 0
+        self.files = 0
+
+    def __iter__(self):
+        for path in expand_paths(self.paths):
+            self.files += 1
+            if _base_name(path).endswith(ARCHIVE_SUFFIXES):
+                yield from self._read_zip(path)
+            elif path.lower().endswith(GZIP_SUFFIX):
+                with gzip.open(path, 'rb') as stream:
+                    yield from self._read_stream(stream, path)
+            else:
+                with open(path, 'rb') as stream:
+                    yield from self._read_stream(stream, path)
+
+    def _read_zip(self, path):
+        with zipfile.ZipFile(path) as archive:
+            for info in sorted(archive.infolist(), key=lambda info: info.filename):
+                name = info.filename
+                if info.is_dir() or not is_supported(name) or _base_name(name).endswith(ARCHIVE_SUFFIXES):
+                    continue
+
+                with archive.open(info) as stream:
+                    if name.lower().endswith(GZIP_SUFFIX):
+                        with gzip.GzipFile(fileobj=stream) as unzipped:
+                            yield from self._read_stream(unzipped, f"{path}:{name}")
+                    else:
+                        yield from self._read_stream(stream, f"{path}:{name}")
+
+    def _read_stream(self, stream, name):
+        base = _base_name(name)
+
+        if base.endswith(JSONL_SUFFIXES):
+            yield from self._read_jsonl(stream, name)
+        elif self.lines:
+            for raw in stream:
+                self.bytes += len(raw)
+                text = raw.decode('utf-8', errors='replace').strip()
+                if text:
+                    self.documents += 1
+                    yield text
+        else:
+            data = stream.read()
+            self.bytes += len(data)
+            text = data.decode('utf-8', errors='replace')
+            if text.strip():
+                self.documents += 1
+                yield text
+
+    def _read_jsonl(self, stream, name):
+        for line_number, raw in enumerate(stream, 1):
+            self.bytes += len(raw)
+            if not raw.strip():
+                continue
+
+            try:
+                record = json.loads(raw)
+            except ValueError as e:
+                logger.warning("Skipping invalid JSON in %s line %d: %s", name, line_number, e)
+                continue
+
+            text = record.get(self.text_field) if isinstance(record, dict) else record
+            if isinstance(text, str) and text.strip():
+                self.documents += 1
+                yield text
+
+
+def read_files(paths, lines=False, text_field='text'):
+    """Read every document from files, directories, globs or archives into a list."""
+    return list(CorpusReader(paths, lines=lines, text_field=text_field))
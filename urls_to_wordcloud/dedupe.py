@@ -0,0 +1,161 @@
+import re
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+from .cache import normalize_url
+
+
+# Query parameters that only track where a click came from. Dropping them
+# doesn't change the page, so URLs differing only in these are duplicates.
+TRACKING_PARAMS = frozenset({
+    'gh_src', 'lever-source', 'lever-origin', 'trk', 'trackingid', 'refid', 'fbclid', 'gclid',
+    'dclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', 'igshid', '_hsenc', '_hsmi',
+})
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_')
+
+# Descriptions whose estimated Jaccard similarity over word shingles is at
+# least this are counted once
+NEAR_DUPLICATE_THRESHOLD = 0.8
+SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 128
+# LSH bands of MINHASH_PERMUTATIONS // LSH_BANDS rows; pairs down to a
+# similarity of about (1 / bands) ** (1 / rows) become candidates
+LSH_BANDS = 32
+MINHASH_SEED = 1
+
+# Universal hashing (a * x + b) mod 2**61 - 1, truncated to 32 bits; the
+# multiplication is allowed to wrap around in uint64, which mixes further
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SHINGLE_WORD_PATTERN = re.compile(r'\w+')
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url):
+    """
+    Return the canonical form of a job posting URL, for deduplication.
+
+    On top of ``normalize_url`` (lowercase scheme and host, no default port
+    or fragment, sorted query), tracking parameters such as ``utm_*`` and
+    ``gh_src`` are dropped, as is a trailing slash on the path. Parameters
+    that identify the posting, like ``gh_jid``, are kept.
+    """
+    parts = urlsplit(normalize_url(url))
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    query = urlencode([(name, value) for name, value in params if not is_tracking_param(name)])
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme, parts.netloc, path, query, ''))
+
+
+def dedupe_urls(urls):
+    """
+    Collapse URLs with the same canonical form.
+
+    Returns a dict mapping each canonical URL to the first URL given for
+    it, in the order they were first seen. The original URL is the one to
+    fetch, since a few sites care about a trailing slash.
+    """
+    unique = {}
+    for url in urls:
+        unique.setdefault(canonicalize_url(url), url)
+    return unique
+
+
+def _shingles(text, size=SHINGLE_SIZE):
+    """Hash the overlapping ``size``-word runs of a text to 32-bit integers."""
+    words = _SHINGLE_WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8'))
+            for i in range(len(words) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """
+    Finds near-duplicate descriptions, like the same job reposted under a
+    new URL, using MinHash signatures over word shingles and LSH banding.
+
+    ``add(key, text)`` returns the key of an earlier text whose estimated
+    Jaccard similarity to ``text`` is at least ``threshold``, or adds the
+    text and returns None. Only candidates sharing an LSH band are compared,
+    so each lookup costs about the same however many texts are indexed.
+    """
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD, permutations=MINHASH_PERMUTATIONS,
+                 bands=LSH_BANDS, shingle_size=SHINGLE_SIZE, seed=MINHASH_SEED):
+        if permutations % bands:
+            raise ValueError("permutations must be a multiple of bands")
+
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = permutations // bands
+        self.shingle_size = shingle_size
+
+        random_state = np.random.RandomState(seed)
+        self._a = random_state.randint(1, (1 << 61) - 1, size=(permutations, 1), dtype=np.uint64)
+        self._b = random_state.randint(0, (1 << 61) - 1, size=(permutations, 1), dtype=np.uint64)
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = {}
+
+    def signature(self, text):
+        """Return the MinHash signature of a text, or None if it has no words."""
+        shingles = _shingles(text, self.shingle_size)
+        if not shingles:
+            return None
+        hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        return (((self._a * hashes + self._b) % _MERSENNE_PRIME) & _MAX_HASH).min(axis=1)
+
+    @staticmethod
+    def similarity(signature_a, signature_b):
+        """Estimate the Jaccard similarity of two texts from their signatures."""
+        return float(np.mean(signature_a == signature_b))
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def find(self, text, signature=None):
+        """Return the key of an indexed near-duplicate of ``text``, or None."""
+        if signature is None:
+            signature = self.signature(text)
+            if signature is None:
+                return None
+
+        checked = set()
+        for band, band_key in self._band_keys(signature):
+            for key in self._buckets[band].get(band_key, ()):
+                if key not in checked:
+                    checked.add(key)
+                    if self.similarity(signature, self._signatures[key]) >= self.threshold:
+                        return key
+        return None
+
+    def add(self, key, text):
+        """
+        Index ``text`` under ``key``, unless it is a near-duplicate of an
+        indexed text, in which case that text's key is returned instead.
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+
+        duplicate_of = self.find(text, signature)
+        if duplicate_of is not None:
+            return duplicate_of
+
+        self._signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(key)
+        return None
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def __len__(self):
+        return len(self._signatures)
@@ -1,51 +1,227 @@
 import re
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
 from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from itertools import islice
 import os
-import glob
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-import nltk
-
-nltk.download('punkt_tab')
-# Download required NLTK data
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-    nltk.download('punkt')
-
-def preprocess_text(text, n_gram_size=1):
+
+from .corpus import read_files
+from .metrics import get_metrics
+from .nltk_resources import english_stopwords, word_tokenize
+from .render import EXPORT_SCALE, layout_wordcloud, render_png, render_svg
+from .topk import SPACE_SAVING_CAPACITY, SpaceSaving, top_k
+
+# Words that appear in nearly every job posting, for use as extra stopwords
+DOMAIN_STOPWORDS = frozenset([
+    'experience', 'team', 'teams', 'work', 'working', 'role', 'job', 'position',
+    'company', 'including', 'ability', 'strong', 'skills', 'years', 'opportunity',
+    'candidate', 'candidates', 'requirements', 'responsibilities', 'qualifications',
+    'preferred', 'required', 'apply', 'benefits', 'equal', 'employer', 'etc',
+])
+
+# Below this many texts calculate_word_frequencies() stays serial: pool
+# start-up and shipping the Counters back cost more than the counting
+PARALLEL_MIN_TEXTS = 5000
+# Texts per task when stream_word_counts() counts on a process pool
+PARALLEL_BATCH_SIZE = 500
+
+NON_WORD_PATTERN = re.compile(r'\W+')
+WORD_PATTERN = re.compile(r'\w+')
+
+
+class Preprocessor:
+    """
+    Reusable text cleaner and tokenizer.
+
+    NLTK's English stopword list is loaded once per process, when the first
+    preprocessor is created, and merged with ``extra_stopwords`` (e.g. ``DOMAIN_STOPWORDS``
+    or a user-supplied list). Words shorter than ``min_length`` are dropped.
+
+    By default words are split with NLTK's ``word_tokenize``. With ``fast``
+    set, a single regex pass is used instead. Once punctuation is stripped
+    the two give the same tokens, except that Punkt splits a few
+    contractions like "cannot", and the regex is several times faster.
+    """
+
+    def __init__(self, extra_stopwords=(), fast=False, min_length=3):
+        self.stop_words = english_stopwords() | frozenset(
+            word.lower() for word in extra_stopwords
+        )
+        self.fast = fast
+        self.min_length = min_length
+
+    def tokenize(self, text):
+        """Lowercase, tokenize and filter a text into words."""
+        metrics = get_metrics()
+        if not metrics.enabled:
+            return self._tokenize(text)
+
+        with metrics.timer('tokenize', mode='fast' if self.fast else 'nltk'):
+            words = self._tokenize(text)
+        metrics.increment('tokens', len(words))
+        metrics.increment('documents_tokenized')
+        return words
+
+    def _tokenize(self, text):
+        text = text.lower()
+
+        if self.fast:
+            words = WORD_PATTERN.findall(text)
+        else:
+            words = word_tokenize(NON_WORD_PATTERN.sub(' ', text))
+
+        stop_words = self.stop_words
+        min_length = self.min_length
+        return [word for word in words if len(word) >= min_length and word not in stop_words]
+
+    def preprocess(self, text, n_gram_size=1):
+        """Tokenize a text, optionally joining the words into n-grams."""
+        words = self.tokenize(text)
+
+        if n_gram_size > 1:
+            return [' '.join(ngram) for ngram in zip(*(words[i:] for i in range(n_gram_size)))]
+        return words
+
+    __call__ = preprocess
+
+
+_default_preprocessor = None
+
+
+def get_preprocessor():
+    """Return the shared default Preprocessor, creating it on first use."""
+    global _default_preprocessor
+
+    if _default_preprocessor is None:
+        _default_preprocessor = Preprocessor()
+    return _default_preprocessor
+
+
+def preprocess_text(text, n_gram_size=1, preprocessor=None):
     """Clean and tokenize text, optionally creating n-grams."""
-    # Remove non-alphanumeric characters and convert to lowercase
-    text = re.sub(r'\W+', ' ', text.lower())
-
-    # Tokenize words
-    words = word_tokenize(text)
-
-    # Filter out short words and stop words
-    stop_words = set(stopwords.words('english'))
-    filtered_words = [word for word in words if len(word) > 2 and word not in stop_words]
-
-    # Create n-grams if specified
-    if n_gram_size > 1:
-        ngrams = []
-        for i in range(len(filtered_words) - n_gram_size + 1):
-            ngram = ' '.join(filtered_words[i:i + n_gram_size])
-            ngrams.append(ngram)
-        return ngrams
-    else:
-        return filtered_words
+    return (preprocessor or get_preprocessor()).preprocess(text, n_gram_size)
 
 
-def calculate_word_frequencies(texts, min_frequency=1, n_gram_size=1):
-    """Calculate word frequencies from texts, filtering by minimum frequency."""
-    word_counts = Counter()
+class NGramIndex:
+    """
+    Unigram, bigram and trigram counts built in a single pass over a corpus.
+
+    Each text is tokenized once. Tokens are interned to integer IDs and
+    n-grams are counted as tuples of IDs, so strings are only built for the
+    n-grams that are actually returned. ``max_entries`` bounds the number of
+    distinct n-grams kept per size: when exceeded, the rarest entries are
+    pruned, which keeps memory flat on large corpora at the cost of slightly
+    undercounting rare n-grams. ``max_error[n]`` bounds that undercount:
+    the true count of any n-gram is at most its count plus ``max_error[n]``.
+    Texts are tokenized with ``preprocessor`` (the shared default if not
+    given).
+    """
+
+    def __init__(self, max_n=3, max_entries=None, preprocessor=None):
+        self.max_n = max_n
+        self.preprocessor = preprocessor or get_preprocessor()
+        self.max_entries = max_entries
+        self.vocabulary = {}
+        self.tokens = []
+        self.counts = {n: Counter() for n in range(1, max_n + 1)}
+        self.max_error = {n: 0 for n in range(1, max_n + 1)}
+        self.documents = 0
+
+    @classmethod
+    def from_texts(cls, texts, max_n=3, max_entries=None, preprocessor=None):
+        """Build an index from an iterable of texts."""
+        index = cls(max_n=max_n, max_entries=max_entries, preprocessor=preprocessor)
+        for text in texts:
+            index.add(text)
+        return index
+
+    def _intern(self, token):
+        token_id = self.vocabulary.get(token)
+        if token_id is None:
+            token_id = len(self.tokens)
+            self.vocabulary[token] = token_id
+            self.tokens.append(token)
+        return token_id
+
+    def add(self, text):
+        """Tokenize one text and add its n-grams to the counts."""
+        ids = [self._intern(word) for word in self.preprocessor.tokenize(text)]
+        self.documents += 1
+
+        for n, counts in self.counts.items():
+            if n == 1:
+                counts.update(ids)
+            else:
+                counts.update(zip(*(ids[i:] for i in range(n))))
+
+            # Drop the rarest entries once the cap is exceeded. Each prune can
+            # lose at most the highest dropped count from any one n-gram.
+            if self.max_entries and len(counts) > self.max_entries:
+                keep = max(1, self.max_entries // 2)
+                kept = counts.most_common(keep + 1)
+                self.max_error[n] += kept.pop()[1]
+                self.counts[n] = Counter(dict(kept))
+
+    def _to_string(self, n, key):
+        if n == 1:
+            return self.tokens[key]
+        return ' '.join(self.tokens[token_id] for token_id in key)
+
+    def word_counts(self, n_gram_size=1, min_frequency=1):
+        """Return ``{n-gram string: count}`` for one n-gram size."""
+        counts = self.counts[n_gram_size]
+        return {self._to_string(n_gram_size, key): count
+                for key, count in counts.items() if count >= min_frequency}
+
+    def top(self, n_gram_size=1, top_n=10):
+        """Return the ``top_n`` most frequent n-grams as ``(string, count)`` pairs."""
+        return [(self._to_string(n_gram_size, key), count)
+                for key, count in top_k(self.counts[n_gram_size], top_n)]
 
+
+def _count_texts(texts, n_gram_size, preprocessor):
+    word_counts = Counter()
     for text in texts:
-        words = preprocess_text(text, n_gram_size)
-        word_counts.update(words)
+        word_counts.update(preprocessor.preprocess(text, n_gram_size))
+    return word_counts
+
+
+def _count_texts_parallel(texts, n_gram_size, preprocessor, workers):
+    """
+    Count one contiguous chunk of texts per worker on a process pool, then
+    merge the per-chunk Counters in this process.
+    """
+    chunk_size = -(-len(texts) // workers)
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+
+    word_counts = Counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_count_texts, chunk, n_gram_size, preprocessor)
+                   for chunk in chunks]
+        for future in as_completed(futures):
+            word_counts.update(future.result())
+
+    return word_counts
+
+
+def calculate_word_frequencies(texts, min_frequency=1, n_gram_size=1, preprocessor=None,
+                               workers=1):
+    """
+    Calculate word frequencies from texts, filtering by minimum frequency.
+
+    With ``workers`` > 1 (or None for one per CPU), each worker counts one
+    chunk of the texts and the chunk counts are merged locally. Fewer than ``PARALLEL_MIN_TEXTS`` texts are always counted
+    serially, since starting the pool would cost more than it saves.
+    """
+    preprocessor = preprocessor or get_preprocessor()
+    texts = list(texts)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers > 1 and len(texts) >= PARALLEL_MIN_TEXTS:
+        word_counts = _count_texts_parallel(texts, n_gram_size, preprocessor, workers)
+    else:
+        word_counts = _count_texts(texts, n_gram_size, preprocessor)
 
     # Filter words by minimum frequency
     filtered_counts = {word: count for word, count in word_counts.items()
@@ -54,31 +230,104 @@ def calculate_word_frequencies(texts, min_frequency=1, n_gram_size=1):
     return filtered_counts
 
 
+def _iter_batches(texts, batch_size):
+    texts = iter(texts)
+    while True:
+        batch = list(islice(texts, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def stream_word_counts(texts, n_gram_size=1, preprocessor=None, workers=1,
+                       batch_size=PARALLEL_BATCH_SIZE):
+    """
+    Count words or n-grams over an iterable of texts of any length, returning
+    a Counter.
+
+    Unlike ``calculate_word_frequencies`` the texts are never all held in
+    memory. With ``workers`` > 1 (or None for one per CPU), batches of
+    ``batch_size`` texts are counted on a process pool, at most two per
+    worker in flight, and merged as they finish.
+    """
+    preprocessor = preprocessor or get_preprocessor()
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        return _count_texts(texts, n_gram_size, preprocessor)
+
+    word_counts = Counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for batch in _iter_batches(texts, batch_size):
+            pending.add(executor.submit(_count_texts, batch, n_gram_size, preprocessor))
+
+            # Bound the batches in flight so reading can't run ahead of counting
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    word_counts.update(future.result())
+
+        for future in as_completed(pending):
+            word_counts.update(future.result())
+
+    return word_counts
+
+
 def get_top_words(word_counts, top_n=10):
-    """Get the top N most frequent words from word_counts."""
+    """
+    Get the top N most frequent words from word_counts, a dict or a
+    ``SpaceSaving`` counter, using heap selection rather than a full sort.
+    """
     if not word_counts:
         return []
 
-    sorted_words = sorted(word_counts.items(), key=lambda x: x[1], reverse=True)
-    return sorted_words[:top_n]
+    return top_k(word_counts, top_n)
+
+
+def approximate_top_words(texts, top_n=10, n_gram_size=1, capacity=SPACE_SAVING_CAPACITY,
+                          preprocessor=None):
+    """
+    Stream texts through a ``SpaceSaving`` counter and return the ``top_n``
+    most frequent words as ``TopItem(item, count, error)`` tuples, where the
+    true count lies between ``count - error`` and ``count``. Memory is
+    bounded by ``capacity`` however large the corpus is.
+    """
+    preprocessor = preprocessor or get_preprocessor()
+    counter = SpaceSaving(capacity)
+    for text in texts:
+        counter.update(preprocessor.preprocess(text, n_gram_size))
+    return counter.top(top_n)
+
 
+def generate_wordcloud(word_counts, max_words=50, min_frequency=2, n_gram_size=1,
+                       output_path=None):
+    """
+    Generate and display word cloud from word counts or weights (e.g. TF-IDF).
 
-def generate_wordcloud(word_counts, max_words=50, min_frequency=2, n_gram_size=1):
-    """Generate and display word cloud."""
+    With ``output_path`` the wordcloud is written to that file instead (SVG
+    if it ends in .svg, PNG otherwise) at full resolution, with no display
+    or matplotlib needed.
+    """
     if not word_counts:
         print("No words found matching the minimum frequency criteria.")
         return
 
-    wordcloud = WordCloud(
-        width=1200,
-        height=800,
-        background_color="white",
-        max_words=max_words,
-        colormap='viridis',
-        relative_scaling=0.5
-    )
+    if output_path:
+        if output_path.lower().endswith('.svg'):
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(render_svg(word_counts, max_words, scale=EXPORT_SCALE))
+        else:
+            with open(output_path, 'wb') as f:
+                f.write(render_png(word_counts, max_words, scale=EXPORT_SCALE, optimize=True))
+        return
 
-    wordcloud.generate_from_frequencies(word_counts)
+    # Only needed for interactive display, so not imported with the module
+    import matplotlib.pyplot as plt
+
+    wordcloud = layout_wordcloud(word_counts, max_words=max_words, scale=EXPORT_SCALE)
 
     # Plot WordCloud
     plt.figure(figsize=(15, 10))
@@ -91,20 +340,23 @@ def generate_wordcloud(word_counts, max_words=50, min_frequency=2, n_gram_size=1
     plt.tight_layout()
     plt.show()
 
-def create_job_descriptions_wordcloud(n_gram_size=1, min_frequency=2, max_words=50):
-    """Create a word cloud from job description files with specified parameters."""
-    # Define the path to job description files
-    job_files_path = "job_descriptions/*.txt"
-
-    # Check if files exist
-    if not glob.glob(job_files_path):
-        print(f"No files found matching pattern: {job_files_path}")
-        return
+def create_job_descriptions_wordcloud(n_gram_size=1, min_frequency=2, max_words=50,
+                                      job_files_path="job_descriptions/*.txt", output_path=None):
+    """
+    Create a word cloud from job description files with specified parameters.
 
+    ``job_files_path`` may be a file, directory or glob of text, JSONL, gzip
+    or zip files. With ``output_path`` the image is saved instead of shown.
+    For large corpora use the command line (``python -m urls_to_wordcloud``),
+    which streams the files rather than reading them all into memory.
+    """
     # Read all job description files
     print(f"Reading job description files from {job_files_path}...")
     corpus = read_files(job_files_path)
-    print(f"Read {len(corpus)} files")
+    if not corpus:
+        print(f"No files found matching pattern: {job_files_path}")
+        return
+    print(f"Read {len(corpus)} documents")
 
     # Calculate word frequencies
     ngram_text = f" ({n_gram_size}-grams)" if n_gram_size > 1 else ""
@@ -114,7 +366,7 @@ def create_job_descriptions_wordcloud(n_gram_size=1, min_frequency=2, max_words=
 
     # Generate and display word cloud
     print("Generating word cloud...")
-    generate_wordcloud(word_counts, max_words, min_frequency, n_gram_size)
+    generate_wordcloud(word_counts, max_words, min_frequency, n_gram_size, output_path)
 
 if __name__ == "__main__":
     # Example usage - you can modify these parameters
@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import threading
+import time
+
+
+# Set to collect metrics in the shared registry from startup
+METRICS_ENABLED = bool(os.environ.get('JD_WORDCLOUD_METRICS'))
+# Sinks for the shared registry: a Prometheus textfile path, and JSON log lines
+METRICS_TEXTFILE = os.environ.get('JD_WORDCLOUD_METRICS_TEXTFILE')
+METRICS_LOG = bool(os.environ.get('JD_WORDCLOUD_METRICS_LOG'))
+METRICS_PREFIX = 'jd_wordcloud'
+
+logger = logging.getLogger('urls_to_wordcloud.metrics')
+
+
+class _NullTimer:
+    """The timer handed out while metrics are disabled: does nothing, allocates nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Metrics:
+    """
+    Thread-safe counters and timers for the pipeline's stages.
+
+    Counters (``increment``) add up values such as bytes fetched or cache
+    hits; timers (``observe``, or ``timer`` as a context manager) record the
+    count, total and maximum of durations in seconds. Both take labels such
+    as ``domain`` or ``selector`` as keyword arguments.
+
+    While ``enabled`` is false every call returns immediately, and code on
+    hot paths checks ``metrics.enabled`` before doing any work for a
+    metric, so disabled instrumentation costs one attribute lookup.
+    ``flush`` hands a snapshot to each sink added with ``add_sink``.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self._counters = {}
+        self._timers = {}
+        self._sinks = []
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                self._timers[key] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                if seconds > timer[2]:
+                    timer[2] = seconds
+
+    def timer(self, name, **labels):
+        """Return a context manager that observes the time spent inside it."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def snapshot(self):
+        """
+        Return the current values as ``{'counters': [...], 'timers': [...]}``,
+        each a list of dicts with ``name``, ``labels`` and the values.
+        """
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in self._counters.items()]
+            timers = [{'name': name, 'labels': dict(labels), 'count': count,
+                       'seconds': total, 'max_seconds': maximum}
+                      for (name, labels), (count, total, maximum) in self._timers.items()]
+        return {'counters': counters, 'timers': timers}
+
+    def merge(self, snapshot):
+        """Add a ``snapshot`` taken from another registry, such as a worker process's."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for metric in snapshot['counters']:
+                key = (metric['name'], tuple(sorted(metric['labels'].items())))
+                self._counters[key] = self._counters.get(key, 0) + metric['value']
+
+            for metric in snapshot['timers']:
+                key = (metric['name'], tuple(sorted(metric['labels'].items())))
+                timer = self._timers.get(key)
+                if timer is None:
+                    self._timers[key] = [metric['count'], metric['seconds'], metric['max_seconds']]
+                else:
+                    timer[0] += metric['count']
+                    timer[1] += metric['seconds']
+                    if metric['max_seconds'] > timer[2]:
+                        timer[2] = metric['max_seconds']
+
+    def counter_total(self, name, **labels):
+        """Sum a counter over every label set that includes ``labels``."""
+        with self._lock:
+            return sum(value for (counter, counter_labels), value in self._counters.items()
+                       if counter == name and labels.items() <= dict(counter_labels).items())
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+    def add_sink(self, sink):
+        """Add a sink: any object with an ``emit(snapshot)`` method."""
+        with self._lock:
+            self._sinks.append(sink)
+
+    def remove_sink(self, sink):
+        with self._lock:
+            if sink in self._sinks:
+                self._sinks.remove(sink)
+
+    def flush(self):
+        """Send a snapshot to every sink."""
+        if not self._sinks:
+            return
+        snapshot = self.snapshot()
+        for sink in list(self._sinks):
+            try:
+                sink.emit(snapshot)
+            except Exception as e:
+                logger.warning("Metrics sink %r failed: %s", sink, e)
+
+
+class LogSink:
+    """Writes each metric as one JSON log line to a ``logging`` logger."""
+
+    def __init__(self, logger=logger, level=logging.INFO):
+        self.logger = logger
+        self.level = level
+
+    def emit(self, snapshot):
+        for kind in ('counters', 'timers'):
+            for metric in snapshot[kind]:
+                self.logger.log(self.level, json.dumps({'type': kind[:-1], **metric},
+                                                       sort_keys=True))
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class PrometheusTextfileSink:
+    """
+    Writes the metrics in Prometheus text format to ``path``, for the node
+    exporter's textfile collector. Counters become ``<prefix>_<name>_total``
+    and timers ``<prefix>_<name>_seconds`` summaries (``_count``/``_sum``).
+    The file is replaced atomically.
+    """
+
+    def __init__(self, path, prefix=METRICS_PREFIX):
+        self.path = path
+        self.prefix = prefix
+
+    def emit(self, snapshot):
+        lines = []
+        for name in sorted({metric['name'] for metric in snapshot['counters']}):
+            metric_name = f"{self.prefix}_{name}_total"
+            lines.append(f"# TYPE {metric_name} counter")
+            lines.extend(f"{metric_name}{_prometheus_labels(metric['labels'])} {metric['value']}"
+                         for metric in snapshot['counters'] if metric['name'] == name)
+
+        for name in sorted({metric['name'] for metric in snapshot['timers']}):
+            metric_name = f"{self.prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric_name} summary")
+            for metric in snapshot['timers']:
+                if metric['name'] == name:
+                    labels = _prometheus_labels(metric['labels'])
+                    lines.append(f"{metric_name}_count{labels} {metric['count']}")
+                    lines.append(f"{metric_name}_sum{labels} {metric['seconds']:.6f}")
+
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temp_path, self.path)
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Return the process-wide metrics registry used by the pipeline, with
+    the sinks configured by ``METRICS_TEXTFILE`` and ``METRICS_LOG``.
+    """
+    global _default_metrics
+
+    if _default_metrics is None:
+        with _default_metrics_lock:
+            if _default_metrics is None:
+                metrics = Metrics()
+                if METRICS_TEXTFILE:
+                    metrics.add_sink(PrometheusTextfileSink(METRICS_TEXTFILE))
+                if METRICS_LOG:
+                    metrics.add_sink(LogSink())
+                _default_metrics = metrics
+    return _default_metrics
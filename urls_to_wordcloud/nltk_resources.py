@@ -0,0 +1,124 @@
+import os
+import threading
+
+
+# Checked before NLTK's own search path; `python -m urls_to_wordcloud.nltk_resources`
+# downloads the resources here so deployments can ship them
+NLTK_DATA_PATH = os.environ.get(
+    'JD_WORDCLOUD_NLTK_DATA',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+)
+# Where missing resources are downloaded instead when NLTK_DATA_PATH can't
+# be written, e.g. in a read-only install; NLTK searches it by default
+NLTK_USER_DATA_PATH = os.path.join(os.path.expanduser('~'), 'nltk_data')
+# Set to refuse downloads and fail fast when a resource is missing
+NLTK_OFFLINE = bool(os.environ.get('JD_WORDCLOUD_NLTK_OFFLINE'))
+
+# The package name and nltk.data path of each resource used
+NLTK_RESOURCES = {
+    'stopwords': 'corpora/stopwords',
+    'punkt_tab': 'tokenizers/punkt_tab',
+}
+
+_available = set()
+# Resources that could not be found or downloaded, so they aren't retried
+_unavailable = {}
+_lock = threading.Lock()
+
+
+def _nltk():
+    import nltk
+
+    if NLTK_DATA_PATH not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_PATH)
+    return nltk
+
+
+def _download(nltk, name):
+    """
+    Download a resource into NLTK_DATA_PATH, or NLTK_USER_DATA_PATH if that
+    can't be written. Returns False if the download failed.
+    """
+    for path in dict.fromkeys((NLTK_DATA_PATH, NLTK_USER_DATA_PATH)):
+        try:
+            os.makedirs(path, exist_ok=True)
+            if not os.access(path, os.W_OK):
+                continue
+            if path not in nltk.data.path:
+                nltk.data.path.append(path)
+            return nltk.download(name, download_dir=path, quiet=True)
+        except OSError:
+            continue
+    return False
+
+
+def ensure_nltk_resource(name):
+    """
+    Make sure an NLTK resource (a key of ``NLTK_RESOURCES``) can be loaded.
+
+    Each resource is looked up once per process, in ``NLTK_DATA_PATH`` first.
+    A missing resource is downloaded into ``NLTK_DATA_PATH`` (or
+    ``NLTK_USER_DATA_PATH`` if it can't be written) unless ``NLTK_OFFLINE``
+    is set; ``LookupError`` is raised if it can't be installed. Nothing
+    touches the network until a resource is actually needed, and a failed
+    download is not retried in the same process.
+    """
+    if name in _available:
+        return
+
+    with _lock:
+        if name in _available:
+            return
+        if name in _unavailable:
+            raise LookupError(_unavailable[name])
+
+        nltk = _nltk()
+        try:
+            nltk.data.find(NLTK_RESOURCES[name])
+        except LookupError:
+            if NLTK_OFFLINE:
+                _unavailable[name] = (
+                    f"NLTK resource {name!r} is not installed and downloads are disabled; "
+                    f"run `python -m urls_to_wordcloud.nltk_resources` to install it "
+                    f"into {NLTK_DATA_PATH}"
+                )
+                raise LookupError(_unavailable[name]) from None
+            if not _download(nltk, name):
+                _unavailable[name] = f"Could not download NLTK resource {name!r}"
+                raise LookupError(_unavailable[name]) from None
+
+        _available.add(name)
+
+
+_english_stopwords = None
+
+
+def english_stopwords():
+    """Return NLTK's English stopwords as a frozenset, loaded once per process."""
+    global _english_stopwords
+
+    if _english_stopwords is None:
+        ensure_nltk_resource('stopwords')
+        from nltk.corpus import stopwords
+
+        _english_stopwords = frozenset(stopwords.words('english'))
+    return _english_stopwords
+
+
+def word_tokenize(text):
+    """NLTK's ``word_tokenize``, imported and its Punkt data checked on first use."""
+    ensure_nltk_resource('punkt_tab')
+    from nltk.tokenize import word_tokenize as nltk_word_tokenize
+
+    return nltk_word_tokenize(text)
+
+
+def download_nltk_data():
+    """Install every resource in ``NLTK_RESOURCES`` into ``NLTK_DATA_PATH``."""
+    for name in NLTK_RESOURCES:
+        ensure_nltk_resource(name)
+
+
+if __name__ == "__main__":
+    download_nltk_data()
+    print(f"NLTK data installed in {NLTK_DATA_PATH}")
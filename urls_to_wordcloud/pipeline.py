@@ -0,0 +1,174 @@
+import os
+import tempfile
+import time
+import weakref
+
+from .generate_wordcloud import NGramIndex
+from .metrics import get_metrics
+from .scrape_url import iter_scrape_urls
+
+
+class TextSink:
+    """
+    Appends scraped texts to a file instead of keeping them in memory.
+
+    Texts are written one per line, so documents can be read back
+    individually with ``iter_documents``, or from ``path`` after ``flush()``.
+    Characters, words and documents are counted as they are written.
+
+    Without a ``path`` a temporary file is created, and deleted by
+    ``close()`` (or once the sink is garbage collected), so keep the sink
+    open for as long as the texts are needed.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='jd-wordcloud-', suffix='.txt')
+            self._file = os.fdopen(fd, 'w', encoding='utf-8')
+            self._finalizer = weakref.finalize(self, _remove_file, self._file, path)
+        else:
+            self._file = open(path, 'w', encoding='utf-8')
+            self._finalizer = None
+
+        self.path = path
+        self.characters = 0
+        self.words = 0
+        self.documents = 0
+
+    def write(self, text):
+        # Descriptions are extracted as single lines of text, but be safe
+        text = ' '.join(text.splitlines())
+        if self.documents:
+            self._file.write('\n')
+            self.characters += 1
+
+        self._file.write(text)
+        self.characters += len(text)
+        self.words += len(text.split())
+        self.documents += 1
+
+    def flush(self):
+        """Write buffered texts through to ``path``."""
+        if not self._file.closed:
+            self._file.flush()
+
+    def read_sample(self, size=1000):
+        """Return the first ``size`` characters written so far."""
+        if not self._file.closed:
+            self._file.flush()
+        with open(self.path, encoding='utf-8') as f:
+            return f.read(size)
+
+    def iter_documents(self):
+        """Yield the texts written so far, one at a time."""
+        if not self._file.closed:
+            self._file.flush()
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                yield line.rstrip('\n')
+
+    def close(self):
+        """Close the file, deleting it if it is a temporary one."""
+        if self._finalizer is not None:
+            self._finalizer()
+        else:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _remove_file(file, path):
+    file.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def stream_word_frequencies(urls, index=None, text_sink=None, keep_text=False, on_event=None,
+                            near_duplicates=None, use_async=False, **scrape_options):
+    """
+    Scrape URLs and count their words incrementally, yielding one event per
+    URL as soon as it has been scraped.
+
+    Each successful description is added to ``index`` (a new ``NGramIndex``
+    if not given) and appended to ``text_sink`` if one is given, then
+    dropped, so memory stays flat however many URLs there are. If
+    ``near_duplicates`` (a ``NearDuplicateIndex``) is given, descriptions
+    that are near-duplicates of one already counted, such as a job reposted
+    under another URL, are left out of both.
+
+    Events are dicts with these keys:
+      - ``position``, ``url``: the URL and its index in ``urls``
+      - ``error``, ``tier``, ``cached``, ``characters``: the scrape result
+      - ``elapsed``: seconds spent scraping this URL
+      - ``parse_cpu``: CPU seconds spent parsing and selecting
+      - ``duplicate_of``: the URL of the description this one near-duplicates,
+        in which case it wasn't counted, or None
+      - ``completed``, ``total``: URLs finished so far, and the batch size
+        (None if ``urls`` has no length)
+      - ``batch_elapsed``: seconds since the batch started
+      - ``index``: the running ``NGramIndex``, for provisional results
+      - ``text``: the description, only when ``keep_text`` is set
+
+    ``on_event``, if given, is called with each event before it is yielded.
+    URLs are scraped by ``iter_scrape_urls``, or with ``use_async`` by
+    ``iter_scrape_urls_sync``, which runs many more fetches at once on one
+    event loop; extra keyword arguments are passed to it.
+    """
+    if index is None:
+        index = NGramIndex()
+
+    total = len(urls) if hasattr(urls, '__len__') else None
+    started = time.perf_counter()
+    completed = 0
+
+    if use_async:
+        # httpx is only needed for the async scraper
+        from .async_scrape import iter_scrape_urls_sync
+
+        scrape = iter_scrape_urls_sync
+    else:
+        scrape = iter_scrape_urls
+
+    for position, details in scrape(urls, **scrape_options):
+        text = details['text']
+        completed += 1
+
+        duplicate_of = None
+        if text and not details['error'] and near_duplicates is not None:
+            duplicate_of = near_duplicates.add(details['url'], text)
+
+        if text and not details['error'] and duplicate_of is None:
+            index.add(text)
+            if text_sink is not None:
+                text_sink.write(text)
+
+        event = {
+            'position': position,
+            'url': details['url'],
+            'error': details['error'],
+            'tier': details['tier'],
+            'cached': details['cached'],
+            'characters': len(text),
+            'elapsed': details['elapsed'],
+            'parse_cpu': details['parse_cpu'],
+            'duplicate_of': duplicate_of,
+            'completed': completed,
+            'total': total,
+            'batch_elapsed': time.perf_counter() - started,
+            'index': index,
+        }
+        if keep_text:
+            event['text'] = text
+
+        if on_event is not None:
+            on_event(event)
+        yield event
+
+    # Hand the batch's metrics to any configured sinks
+    get_metrics().flush()
@@ -0,0 +1,130 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger('urls_to_wordcloud.profiles')
+
+PROFILES_PATH = os.environ.get(
+    'JD_WORDCLOUD_PROFILES',
+    os.path.join(os.path.expanduser('~'), '.cache', 'jd-wordcloud', 'domain_profiles.json')
+)
+PROFILE_MAX_MISSES = 3
+PROFILE_SAVE_INTERVAL = 5
+
+
+class DomainProfileStore:
+    """
+    Per-host extraction profiles learned from successful scrapes.
+
+    A profile records the description selector that worked for a host and
+    whether the description needed JavaScript rendering. ``scrape_url``
+    tries the profile's selector before the generic scan, and skips
+    rendering for hosts whose descriptions were found in the static HTML.
+
+    A profile is dropped after ``max_misses`` scrapes in a row fail to find
+    a description, so a redesigned site falls back to the generic path.
+    Profiles are persisted as JSON at ``path`` (set it to None to keep them
+    in memory only), at most every ``save_interval`` seconds and on exit.
+    """
+
+    def __init__(self, path=PROFILES_PATH, max_misses=PROFILE_MAX_MISSES,
+                 save_interval=PROFILE_SAVE_INTERVAL):
+        self.path = path
+        self.max_misses = max_misses
+        self.save_interval = save_interval
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._profiles = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Could not load domain profiles from %s: %s", path, e)
+
+    def get(self, host):
+        """Return a copy of the profile for a host, or None."""
+        with self._lock:
+            profile = self._profiles.get(host)
+            return dict(profile) if profile else None
+
+    def record_success(self, host, selector, rendered):
+        """Remember the selector that found a description and whether rendering was needed."""
+        with self._lock:
+            self._profiles[host] = {
+                'selector': selector,
+                'rendered': rendered,
+                'misses': 0,
+                'updated': time.time(),
+            }
+            self._changed()
+
+    def record_miss(self, host):
+        """Count a failed extraction, dropping the profile after too many in a row."""
+        with self._lock:
+            profile = self._profiles.get(host)
+            if profile is None:
+                return
+
+            profile['misses'] += 1
+            profile['updated'] = time.time()
+            if profile['misses'] >= self.max_misses:
+                del self._profiles[host]
+            self._changed()
+
+    def forget(self, host):
+        with self._lock:
+            if self._profiles.pop(host, None) is not None:
+                self._changed()
+
+    def _changed(self):
+        self._dirty = True
+        if time.time() - self._last_save >= self.save_interval:
+            self._save()
+
+    def _save(self):
+        if not self.path or not self._dirty:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._profiles, f, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not save domain profiles to %s: %s", self.path, e)
+            return
+
+        self._dirty = False
+        self._last_save = time.time()
+
+    def save(self):
+        """Write any unsaved changes to disk."""
+        with self._lock:
+            self._save()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._profiles)
+
+
+_default_profile_store = None
+_default_profile_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    """Return the process-wide domain profile store, creating it on first use."""
+    global _default_profile_store
+
+    with _default_profile_store_lock:
+        if _default_profile_store is None:
+            _default_profile_store = DomainProfileStore()
+            atexit.register(_default_profile_store.save)
+        return _default_profile_store
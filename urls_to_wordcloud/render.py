@@ -0,0 +1,139 @@
+import copy
+import io
+import threading
+from collections import OrderedDict
+
+from .metrics import get_metrics
+from .topk import top_k
+
+
+PREVIEW_WIDTH = 600
+PREVIEW_HEIGHT = 400
+# Full-resolution exports are the preview layout drawn at this scale (1200x800)
+EXPORT_SCALE = 2
+LAYOUT_CACHE_SIZE = 32
+
+DEFAULT_COLORMAP = 'viridis'
+DEFAULT_BACKGROUND = 'white'
+RELATIVE_SCALING = 0.5
+# Fixed so the same words always get the same placement and colors
+RANDOM_STATE = 0
+
+
+class LayoutCache:
+    """
+    A bounded LRU cache of computed wordcloud layouts.
+
+    Placing the words is the expensive part of drawing a wordcloud. A layout
+    is keyed by the words it can hold (the ``max_words`` heaviest
+    frequencies), the canvas size and ``max_words``, so recoloring or
+    exporting at another scale reuses it instead of placing the words again.
+    """
+
+    def __init__(self, max_size=LAYOUT_CACHE_SIZE):
+        self.max_size = max_size
+        self._layouts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, frequencies, width=PREVIEW_WIDTH, height=PREVIEW_HEIGHT, max_words=50,
+            relative_scaling=RELATIVE_SCALING, random_state=RANDOM_STATE):
+        """Return a generated ``WordCloud`` for the frequencies, laying it out on a miss."""
+        # WordCloud only places the max_words heaviest words, so nothing else affects the layout
+        words = tuple(sorted(top_k(frequencies, max_words)))
+        key = (words, width, height, max_words, relative_scaling, random_state)
+        metrics = get_metrics()
+
+        with self._lock:
+            wordcloud = self._layouts.get(key)
+            if wordcloud is not None:
+                self._layouts.move_to_end(key)
+                metrics.increment('layout_cache_hits')
+                return wordcloud
+        metrics.increment('layout_cache_misses')
+
+        from wordcloud import WordCloud
+
+        wordcloud = WordCloud(
+            width=width,
+            height=height,
+            background_color=DEFAULT_BACKGROUND,
+            max_words=max_words,
+            colormap=DEFAULT_COLORMAP,
+            relative_scaling=relative_scaling,
+            random_state=random_state
+        )
+        with metrics.timer('layout'):
+            wordcloud.generate_from_frequencies(dict(words))
+
+        with self._lock:
+            self._layouts[key] = wordcloud
+            while len(self._layouts) > self.max_size:
+                self._layouts.popitem(last=False)
+        return wordcloud
+
+    def clear(self):
+        with self._lock:
+            self._layouts.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._layouts)
+
+
+_default_layout_cache = LayoutCache()
+
+
+def layout_wordcloud(frequencies, width=PREVIEW_WIDTH, height=PREVIEW_HEIGHT, max_words=50,
+                     colormap=DEFAULT_COLORMAP, background_color=DEFAULT_BACKGROUND,
+                     scale=1, random_state=RANDOM_STATE, layout_cache=None):
+    """
+    Return a ``WordCloud`` with the words placed and colored, ready to export.
+
+    The layout comes from ``layout_cache`` (the shared default if not given)
+    and is copied before recoloring, so the cached layout is never modified.
+    ``scale`` multiplies the output size without changing the layout.
+    """
+    layout_cache = layout_cache if layout_cache is not None else _default_layout_cache
+    cached = layout_cache.get(frequencies, width, height, max_words, random_state=random_state)
+
+    wordcloud = copy.copy(cached)
+    wordcloud.scale = scale
+    wordcloud.background_color = background_color
+    if colormap != DEFAULT_COLORMAP:
+        # recolor() replaces layout_ with a new list, leaving the cached one alone
+        wordcloud.recolor(colormap=colormap, random_state=random_state)
+    return wordcloud
+
+
+def render_png(frequencies, max_words=50, width=PREVIEW_WIDTH, height=PREVIEW_HEIGHT, scale=1,
+               colormap=DEFAULT_COLORMAP, background_color=DEFAULT_BACKGROUND, optimize=False,
+               layout_cache=None):
+    """
+    Draw a wordcloud straight to PNG bytes, without going through matplotlib.
+
+    The defaults give a quick preview; pass ``scale=EXPORT_SCALE`` (or more)
+    for a full-resolution export of the same layout. Returns None if there
+    are no words.
+    """
+    if not frequencies:
+        return None
+
+    wordcloud = layout_wordcloud(frequencies, width, height, max_words, colormap,
+                                 background_color, scale, layout_cache=layout_cache)
+    buffer = io.BytesIO()
+    with get_metrics().timer('draw', format='png'):
+        wordcloud.to_image().save(buffer, format='PNG', optimize=optimize)
+    return buffer.getvalue()
+
+
+def render_svg(frequencies, max_words=50, width=PREVIEW_WIDTH, height=PREVIEW_HEIGHT, scale=1,
+               colormap=DEFAULT_COLORMAP, background_color=DEFAULT_BACKGROUND,
+               layout_cache=None):
+    """Draw a wordcloud as an SVG document string, or None if there are no words."""
+    if not frequencies:
+        return None
+
+    wordcloud = layout_wordcloud(frequencies, width, height, max_words, colormap,
+                                 background_color, scale, layout_cache=layout_cache)
+    with get_metrics().timer('draw', format='svg'):
+        return wordcloud.to_svg(embed_font=False)
@@ -1,6 +1,26 @@
-from bs4 import BeautifulSoup
-from requests_html import HTMLSession
+import atexit
+import codecs
+import logging
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
 
+import requests
+from lxml import etree
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .browser_pool import get_browser_pool
+from .cache import get_page_cache
+from .metrics import get_metrics
+from .profiles import get_profile_store
+
+logger = logging.getLogger('urls_to_wordcloud.scrape_url')
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -11,7 +31,7 @@ HEADERS = {
     'Upgrade-Insecure-Requests': '1',
 }
 
-NOT_FOUND_SELECTORS = [
+NOT_FOUND_PHRASES = [
     # Common text patterns
     "job you're looking for isn't available",
     "job not found",
@@ -70,102 +90,968 @@ DESCRIPTION_SELECTORS = [
     '.position-description'
 ]
 
+# Elements dropped before extracting text
+STRIPPED_TAGS = ("script", "style", "meta", "link", "noscript")
+
+# Matches any NOT_FOUND_PHRASES entry in lowercased HTML, tolerating
+# entity-encoded apostrophes and any run of whitespace between words
+NOT_FOUND_PATTERN = re.compile('|'.join(
+    re.escape(phrase)
+    .replace("'", r"(?:'|&\#39;|&\#x27;|&apos;|’|&rsquo;)")
+    .replace(r'\ ', r'\s+')
+    for phrase in NOT_FOUND_PHRASES
+))
+SCRIPT_STYLE_PATTERN = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+# Defaults for batch scraping with scrape_urls()
+MAX_CONCURRENCY = 8
+PER_HOST_LIMIT = 2
+
+# Descriptions shorter than this are treated as missing
+MIN_DESCRIPTION_LENGTH = 100
+
+# JavaScript rendering modes for scrape_url()
+RENDER_AUTO = 'auto'
+RENDER_ALWAYS = 'always'
+RENDER_NEVER = 'never'
+RENDER_MODES = (RENDER_AUTO, RENDER_ALWAYS, RENDER_NEVER)
+# Render modes from least to most rendering. A cached result is served to
+# requests for its own mode or an earlier one; later modes re-extract it.
+RENDER_ORDER = (RENDER_NEVER, RENDER_AUTO, RENDER_ALWAYS)
 
-def scrape_url(url):
+# Which HTML a description was extracted from
+TIER_STATIC = 'static'
+TIER_RENDERED = 'rendered'
+
+# Error returned for expired or removed postings
+JOB_NOT_FOUND = "Job not found"
+
+# Passed to BrowserPool.render: a shorter timeout and a single scroll for better compatibility
+RENDER_OPTIONS = {'timeout': 10, 'sleep': 1, 'scrolldown': 1, 'user_agent': HEADERS['User-Agent']}
+
+# Responses are read up to this many bytes; the rest is dropped and the
+# prefix parsed, so memory stays bounded whatever a site returns
+MAX_BODY_BYTES = 2 * 1024 * 1024
+BODY_CHUNK_SIZE = 64 * 1024
+# Responses with any other Content-Type (PDFs, images, ...) are rejected
+# from the headers, before the body is read
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'application/xml', 'text/xml',
+                      'text/plain')
+UNSUPPORTED_CONTENT_TYPE = "Unsupported content type"
+# Bodies are decoded with the charset declared in the Content-Type header,
+# else a byte order mark, else an XML declaration or <meta> charset in the
+# first META_CHARSET_BYTES, else as DEFAULT_CHARSET
+HEADER_CHARSET_PATTERN = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+META_CHARSET_PATTERN = re.compile(
+    rb'^\s*<\?xml[^>]+encoding\s*=\s*["\']([\w.:-]+)'
+    rb'|<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)',
+    re.IGNORECASE
+)
+META_CHARSET_BYTES = 4096
+BYTE_ORDER_MARKS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'),
+                    (codecs.BOM_UTF16_BE, 'utf-16'))
+DEFAULT_CHARSET = 'utf-8'
+# Extracted descriptions are cut off at this many characters
+MAX_TEXT_CHARS = 100_000
+# Page text included in log messages is cut off at this many characters
+LOGGED_TEXT_CHARS = 500
+
+# Defaults for the shared HTTP session pool
+REQUEST_TIMEOUT = 30
+SESSION_POOL_SIZE = 4
+CONNECTIONS_PER_HOST = 10
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class SessionPool:
     """
-    Scrape a URL and return the job description.
+    A fixed set of HTTP sessions shared across scrape calls.
+
+    Each host is pinned to one session, so postings from the same ATS
+    (Greenhouse, Lever, Workday, ...) reuse its warm keep-alive connections,
+    TLS sessions and cookies. Connection errors and 429/5xx responses are
+    retried with exponential backoff. Use it as a context manager or call
+    ``close()`` when done.
     """
-    session = HTMLSession()
+
+    def __init__(self, size=SESSION_POOL_SIZE, connections_per_host=CONNECTIONS_PER_HOST,
+                 max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR):
+        self.size = max(1, size)
+        self.connections_per_host = connections_per_host
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _create_session(self):
+        session = requests.Session()
+        session.headers.update(HEADERS)
+
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=self.connections_per_host,
+            max_retries=retry
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def session_for(self, url):
+        """Return the session that owns the connections for this URL's host."""
+        host = urlparse(url).netloc.lower()
+        index = zlib.crc32(host.encode('utf-8')) % self.size
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SessionPool is closed")
+            if index not in self._sessions:
+                self._sessions[index] = self._create_session()
+            return self._sessions[index]
+
+    def get(self, url, **kwargs):
+        """GET a URL through the pooled session for its host."""
+        kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+        return self.session_for(url).get(url, **kwargs)
+
+    def close(self):
+        """Close every session and release its connections."""
+        with self._lock:
+            self._closed = True
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+
+        for session in sessions:
+            try:
+                session.close()
+            except Exception as e:
+                logger.warning("Error closing session: %s", e)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_default_session_pool = None
+_default_session_pool_lock = threading.Lock()
+
+
+def get_session_pool():
+    """Return the process-wide session pool, creating it on first use."""
+    global _default_session_pool
+
+    with _default_session_pool_lock:
+        if _default_session_pool is None:
+            _default_session_pool = SessionPool()
+            atexit.register(_default_session_pool.close)
+        return _default_session_pool
+
+
+def host_requires_rendering(url, profiles=None):
+    """
+    Return True/False if this URL's host is known to need (or not need)
+    JavaScript rendering, or None if it has no profile yet.
+    """
+    if profiles is None:
+        profiles = get_profile_store()
+    profile = profiles.get(urlparse(url).netloc.lower())
+    return profile['rendered'] if profile else None
+
+
+def find_not_found_phrase(html):
+    """
+    Return the first "job not found" phrase in a raw HTML page, or None.
+
+    All of ``NOT_FOUND_PHRASES`` are matched in one pass of a single
+    compiled regex over the lowercased page, with script and style blocks
+    removed, so expired postings can be rejected before any parsing,
+    selector scans or rendering.
+    """
+    match = NOT_FOUND_PATTERN.search(SCRIPT_STYLE_PATTERN.sub(' ', html.lower()))
+    return match.group(0) if match else None
+
+
+def _compile_selector(selector):
+    """
+    Compile one of the simple CSS selectors used in this module into a
+    predicate on lxml elements. Supports ``tag``, ``.class``, ``#id`` and
+    ``[attr*="value"]``.
+    """
+    match = re.fullmatch(r'\[([\w-]+)\*="([^"]*)"\]', selector)
+    if match:
+        attribute, value = match.groups()
+        return lambda element: value in (element.get(attribute) or '')
+
+    if re.fullmatch(r'\.[\w-]+', selector):
+        class_name = selector[1:]
+        return lambda element: class_name in (element.get('class') or '').split()
+
+    if re.fullmatch(r'#[\w-]+', selector):
+        element_id = selector[1:]
+        return lambda element: element.get('id') == element_id
+
+    if re.fullmatch(r'[a-z][a-z0-9]*', selector):
+        return lambda element: element.tag == selector
+
+    raise ValueError(f"Unsupported selector: {selector!r}")
+
+
+def _selector_condition(selector):
+    """Translate a selector supported by ``_compile_selector`` into an XPath condition."""
+    match = re.fullmatch(r'\[([\w-]+)\*="([^"]*)"\]', selector)
+    if match:
+        return 'contains(@{}, "{}")'.format(*match.groups())
+
+    if re.fullmatch(r'\.[\w-]+', selector):
+        return f'contains(concat(" ", normalize-space(@class), " "), " {selector[1:]} ")'
+
+    if re.fullmatch(r'#[\w-]+', selector):
+        return f'@id="{selector[1:]}"'
+
+    if re.fullmatch(r'[a-z][a-z0-9]*', selector):
+        return f'self::{selector}'
+
+    raise ValueError(f"Unsupported selector: {selector!r}")
+
+
+class SelectorPlan:
+    """
+    Description and "not found" selectors compiled once and evaluated
+    together in a single walk of the document tree.
+
+    Each selector is also compiled to an XPath expression, so a page whose
+    description selector is already known (see ``DomainProfileStore``) can
+    be handled with two lookups instead of a full scan.
+    """
+
+    def __init__(self, description_selectors, not_found_selectors):
+        self.description_selectors = list(description_selectors)
+        self.not_found_selectors = list(not_found_selectors)
+        self._description_predicates = [_compile_selector(s) for s in self.description_selectors]
+        self._not_found_predicates = [_compile_selector(s) for s in self.not_found_selectors]
+
+        self._xpaths = {}
+        self._not_found_xpath = etree.XPath('(//*[{}])[1]'.format(
+            ' or '.join(_selector_condition(s) for s in self.not_found_selectors)
+        ))
+
+    def find(self, root, selector):
+        """Return the first element matching one selector, or None."""
+        xpath = self._xpaths.get(selector)
+        if xpath is None:
+            xpath = self._xpaths[selector] = etree.XPath(
+                f'(//*[{_selector_condition(selector)}])[1]'
+            )
+        matches = xpath(root)
+        return matches[0] if matches else None
+
+    def find_not_found(self, root):
+        """Return the "not found" selectors matched by the first element that matches any of them."""
+        matches = self._not_found_xpath(root)
+        if not matches:
+            return []
+        return [selector
+                for selector, predicate in zip(self.not_found_selectors, self._not_found_predicates)
+                if predicate(matches[0])]
+
+    def evaluate(self, root):
+        """
+        Walk the tree under ``root`` once.
+
+        Returns ``(descriptions, not_found)``. ``descriptions`` lists
+        ``(selector, element)`` pairs in selector order, pairing each
+        description selector that matched with its first match in document
+        order. ``not_found`` lists the "not found" selectors that matched
+        anything, in selector order.
+        """
+        first_matches = [None] * len(self._description_predicates)
+        not_found_hits = [False] * len(self._not_found_predicates)
+        unmatched = len(first_matches)
+
+        for element in root.iter(etree.Element):
+            if unmatched:
+                for i, predicate in enumerate(self._description_predicates):
+                    if first_matches[i] is None and predicate(element):
+                        first_matches[i] = element
+                        unmatched -= 1
+
+            for i, predicate in enumerate(self._not_found_predicates):
+                if not not_found_hits[i] and predicate(element):
+                    not_found_hits[i] = True
+
+        descriptions = [(selector, element)
+                        for selector, element in zip(self.description_selectors, first_matches)
+                        if element is not None]
+        not_found = [selector
+                     for selector, hit in zip(self.not_found_selectors, not_found_hits)
+                     if hit]
+        return descriptions, not_found
+
+
+SELECTOR_PLAN = SelectorPlan(DESCRIPTION_SELECTORS, NOT_FOUND_SELECTORS)
+
+
+def _element_text(element, limit=MAX_TEXT_CHARS):
+    """
+    Join an element's text nodes with spaces, like BeautifulSoup's
+    get_text(' ', strip=True), stopping once ``limit`` characters are reached.
+    """
+    parts = []
+    length = 0
+    for text in element.itertext():
+        text = text.strip()
+        if text:
+            parts.append(text)
+            length += len(text) + 1
+            if length > limit:
+                break
+    return ' '.join(parts)[:limit]
+
+
+def _content_type_error(headers):
+    """Return an error for a response whose Content-Type isn't HTML or text, or ''."""
+    content_type = headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type and content_type not in HTML_CONTENT_TYPES:
+        return f"{UNSUPPORTED_CONTENT_TYPE}: {content_type}"
+    return ""
+
+
+def _body_encoding(body, headers):
+    """
+    Return the encoding of a response body. Only a charset the server
+    declared counts: ``requests`` falls back to ISO-8859-1 for any text/*
+    response without one, which garbles UTF-8 pages.
+    """
+    match = HEADER_CHARSET_PATTERN.search(headers.get('Content-Type', ''))
+    if match:
+        encoding = match.group(1)
+    else:
+        for mark, encoding in BYTE_ORDER_MARKS:
+            if body.startswith(mark):
+                return encoding
+        match = META_CHARSET_PATTERN.search(body[:META_CHARSET_BYTES])
+        encoding = match.group(match.lastindex).decode('ascii') if match else DEFAULT_CHARSET
 
     try:
-        response = session.get(url, headers=HEADERS, timeout=30)
-        response.raise_for_status()
-    except Exception as e:
-        print(f"Error fetching URL {url}: {e}")
-        return ("", e)
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return DEFAULT_CHARSET
 
-    # Try to render JavaScript, but handle cases where it fails
+
+def _decode_body(body, headers):
+    """Decode a response body for either fetcher (see ``_body_encoding``)."""
+    # A body cut off at MAX_BODY_BYTES may end partway through a character
+    return body.decode(_body_encoding(body, headers), errors='replace')
+
+
+def _read_body(response, max_bytes):
+    """
+    Read a streamed ``requests`` response up to ``max_bytes`` and close it.
+    Returns ``(body, truncated)``.
+    """
+    chunks = []
+    size = 0
+    truncated = False
     try:
-        # Use a shorter timeout and disable some features for better compatibility
-        response.html.render(timeout=10, sleep=1, scrolldown=1)
-    except Exception as render_error:
-        # If rendering fails, continue with the static HTML
-        print(f"JavaScript rendering failed for {url}, using static HTML content")
+        for chunk in response.iter_content(BODY_CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                truncated = True
+                break
+    finally:
+        response.close()
+    return b''.join(chunks)[:max_bytes], truncated
 
-    html = response.html
 
-    soup = BeautifulSoup(html.html, 'html.parser')
+def _parse_html(html):
+    try:
+        return lxml_html.document_fromstring(html)
+    except ValueError:
+        # lxml refuses str input that carries its own encoding declaration;
+        # the text is already decoded, so that declaration must be ignored.
+        # Parsers aren't thread-safe, hence a new one each time.
+        return lxml_html.document_fromstring(html.encode('utf-8'),
+                                             parser=lxml_html.HTMLParser(encoding='utf-8'))
+    except etree.ParserError:
+        return None
 
-    # Remove script and style elements
-    for script in soup(["script", "style", "meta", "link", "noscript"]):
-        script.decompose()
+
+def _extract_description(html, quiet=False, preferred_selector=None, check_phrases=True):
+    """
+    Extract the job description from an HTML document.
+
+    Returns ``(text, error, selector)``, where ``selector`` is the
+    description selector the text came from. ``preferred_selector`` is
+    tried on its own first, skipping the generic scan when it finds a
+    description. ``check_phrases=False`` skips the "not found" phrase check
+    for pages that have already been through ``find_not_found_phrase``.
+    """
+    # Check if the page indicates the job is not found or unavailable
+    phrase = find_not_found_phrase(html) if html and check_phrases else None
+    if phrase:
+        if not quiet:
+            logger.info("Job not found indicator detected: '%s'", phrase)
+        return ("", JOB_NOT_FOUND, None)
+
+    root = _parse_html(html) if html else None
+    body = root.find('body') if root is not None else None
 
     # Check if body exists
-    if not soup.body:
-        print("HTML content:")
-        print(soup.prettify()[:1000])
-        return ("", "No body element found in the HTML. The page might be empty or malformed.")
+    if body is None:
+        if not quiet:
+            logger.debug("No body element in HTML: %.*s", LOGGED_TEXT_CHARS, html or '')
+        return ("", "No body element found in the HTML. The page might be empty or malformed.", None)
 
-    # Check for common "not found" or "job unavailable" indicators
+    # Remove script and style elements
+    etree.strip_elements(root, *STRIPPED_TAGS, with_tail=False)
+    etree.strip_elements(root, etree.Comment, with_tail=False)
 
+    if preferred_selector:
+        not_found = SELECTOR_PLAN.find_not_found(root)
+        if not_found:
+            if not quiet:
+                logger.info("Job not found selector detected: '%s'", not_found[0])
+            return ("", JOB_NOT_FOUND, None)
 
-    # Get all text first
-    all_text = soup.body.get_text(separator=' ', strip=True)
+        element = SELECTOR_PLAN.find(root, preferred_selector)
+        if element is not None:
+            job_description = _element_text(element)
+            if len(job_description) > MIN_DESCRIPTION_LENGTH:
+                return (job_description, "", preferred_selector)
 
-    # Check if the page indicates the job is not found or unavailable
-    job_not_found = False
+    descriptions, not_found = SELECTOR_PLAN.evaluate(root)
+
+    # Check CSS selector-based indicators
+    if not_found:
+        if not quiet:
+            logger.info("Job not found selector detected: '%s'", not_found[0])
+        return ("", JOB_NOT_FOUND, None)
 
-    # Check text-based indicators
-    for indicator in NOT_FOUND_SELECTORS:
-        if indicator.lower() in all_text.lower():
-            job_not_found = True
-            print(f"Job not found indicator detected: '{indicator}'")
+    # Extract job description - look for common containers
+    job_description = ""
+    job_selector = None
+
+    # Common selectors for job descriptions, using the first matching element of each
+    for selector, element in descriptions:
+        job_description = _element_text(element)
+        job_selector = selector
+        if len(job_description) > MIN_DESCRIPTION_LENGTH:  # Ensure we have substantial content
+            if not quiet:
+                logger.debug("Found job description using selector: %s", selector)
             break
 
-    # Check CSS selector-based indicators
-    if not job_not_found:
-        for selector in NOT_FOUND_SELECTORS:
-            elements = soup.select(selector)
-            if elements:
-                job_not_found = True
-                print(f"Job not found selector detected: '{selector}'")
-                break
+    if job_description:
+        return (job_description, "", job_selector)
 
-        # if job_not_found:
-        #     print("Job posting appears to be unavailable or not found.")
-        #     print("Full page text:")
-        #     print(all_text)
-        # else:
-        #     print("Job posting appears to be available.")
-
-        # Extract job description - look for common containers
-        job_description = ""
-
-        # Common selectors for job descriptions
-        for selector in DESCRIPTION_SELECTORS:
-            elements = soup.select(selector)
-            if elements:
-                # Get the text from the first matching element
-                job_description = elements[0].get_text(separator=' ', strip=True)
-                if len(job_description) > 100:  # Ensure we have substantial content
-                    print(f"Found job description using selector: {selector}")
+    if not quiet:
+        logger.debug("Could not extract job description. Page text starts: %s",
+                     _element_text(body, limit=LOGGED_TEXT_CHARS))
+    return ("", "Could not extract job description", None)
+
+
+def extract_job_description(html, quiet=False):
+    """
+    Extract the job description from an HTML document.
+
+    The page is parsed once with lxml and every selector is evaluated in a
+    single pass over the tree (see ``SelectorPlan``). Returns a
+    ``(text, error)`` tuple like ``scrape_url``. With ``quiet`` set, nothing
+    is printed on failure.
+    """
+    text, error, _ = _extract_description(html, quiet=quiet)
+    return (text, error)
+
+
+def _extract_static(url, html, render, profiles):
+    """
+    The static half of ``_extract_tiered``. Returns ``(result, state)``:
+    either the final ``(text, error, tier, render_failed)`` result and None,
+    or None and the state ``_extract_rendered`` needs once the page has
+    been rendered.
+    """
+    host = urlparse(url).netloc.lower()
+    metrics = get_metrics()
+    learn = render == RENDER_AUTO and profiles is not None
+    profile = profiles.get(host) if learn else None
+    preferred_selector = profile['selector'] if profile else None
+    needs_rendering = profile['rendered'] if profile else None
+
+    static_result = None
+    try_static = render == RENDER_NEVER or (render == RENDER_AUTO and needs_rendering is not True)
+
+    # Expired postings are rejected from the raw response, before rendering
+    phrase = find_not_found_phrase(html)
+    if phrase:
+        logger.info("Job not found indicator detected at %s: '%s'", url, phrase)
+        metrics.increment('expired_postings', domain=host)
+        return ("", JOB_NOT_FOUND, TIER_STATIC, False), None
+
+    if try_static:
+        text, error, selector = _extract_description(html, quiet=render == RENDER_AUTO,
+                                                     preferred_selector=preferred_selector,
+                                                     check_phrases=False)
+        static_result = (text, error)
+
+        if len(text) > MIN_DESCRIPTION_LENGTH:
+            metrics.increment('selector_hits', domain=host, selector=selector, tier=TIER_STATIC)
+            if learn:
+                profiles.record_success(host, selector, rendered=False)
+            return (text, error, TIER_STATIC, False), None
+
+        if render == RENDER_NEVER:
+            metrics.increment('selector_misses', domain=host, tier=TIER_STATIC)
+            return (text, error, TIER_STATIC, False), None
+
+        if needs_rendering is False:
+            # The profile says static HTML is enough for this host, so don't render
+            if error != JOB_NOT_FOUND:
+                profiles.record_miss(host)
+            metrics.increment('selector_misses', domain=host, tier=TIER_STATIC)
+            return (text, error, TIER_STATIC, False), None
+
+        # The static HTML had no description, so fall back to rendering
+        metrics.increment('render_fallbacks', domain=host)
+
+    state = {'host': host, 'learn': learn, 'preferred_selector': preferred_selector,
+             'static_result': static_result}
+    return None, state
+
+
+def _extract_rendered(url, html, rendered_html, render_error, profiles, state):
+    """
+    The rendered half of ``_extract_tiered``: extract from ``rendered_html``,
+    or fall back to the static HTML if rendering raised ``render_error``.
+    """
+    host = state['host']
+    metrics = get_metrics()
+    static_result = state['static_result']
+
+    if render_error is not None:
+        # If rendering fails, continue with the static HTML
+        logger.warning("JavaScript rendering failed for %s, using static HTML content: %s",
+                       url, render_error)
+        metrics.increment('render_failures', domain=host)
+        if static_result is None:
+            static_result = _extract_description(html, check_phrases=False)[:2]
+        return static_result + (TIER_STATIC, True)
+
+    # The browser has no size limit of its own
+    text, error, selector = _extract_description(rendered_html[:MAX_BODY_BYTES],
+                                                 preferred_selector=state['preferred_selector'])
+    if len(text) > MIN_DESCRIPTION_LENGTH:
+        metrics.increment('selector_hits', domain=host, selector=selector, tier=TIER_RENDERED)
+    elif error != JOB_NOT_FOUND:
+        metrics.increment('selector_misses', domain=host, tier=TIER_RENDERED)
+
+    if state['learn']:
+        if len(text) > MIN_DESCRIPTION_LENGTH:
+            profiles.record_success(host, selector, rendered=True)
+        elif error != JOB_NOT_FOUND:
+            profiles.record_miss(host)
+
+    # Keep a short static description over an empty rendered page
+    if not text and static_result and static_result[0]:
+        return static_result + (TIER_STATIC, False)
+
+    return (text, error, TIER_RENDERED, False)
+
+
+def _extract_tiered(url, html, render, browser_pool, profiles):
+    """
+    Extract a description from a fetched page, rendering JavaScript as
+    ``render`` allows. Returns a ``(text, error, tier, render_failed)``
+    tuple; ``render_failed`` is True when rendering was needed but raised,
+    and the result came from the static HTML instead.
+
+    In ``'auto'`` mode the host's profile in ``profiles`` (unless None) supplies
+    the selector to try first and says whether to render, and the outcome
+    is recorded back into it.
+    """
+    result, state = _extract_static(url, html, render, profiles)
+    if result is not None:
+        return result
+
+    # Try to render JavaScript, but handle cases where it fails
+    rendered_html = render_error = None
+    try:
+        with get_metrics().timer('render', domain=state['host']):
+            rendered_html = browser_pool.render(url, **RENDER_OPTIONS)
+    except Exception as e:
+        render_error = e
+
+    return _extract_rendered(url, html, rendered_html, render_error, profiles, state)
+
+
+def _resolve_shared(browser_pool, cache, profiles):
+    """Resolve the shared-instance defaults: None means the shared instance, False means disabled."""
+    if browser_pool is None:
+        browser_pool = get_browser_pool()
+    if cache is None:
+        cache = get_page_cache()
+    elif cache is False:
+        cache = None
+    if profiles is None:
+        profiles = get_profile_store()
+    elif profiles is False:
+        profiles = None
+    return browser_pool, cache, profiles
+
+
+def _new_details(url, error=""):
+    return {'url': url, 'text': "", 'error': error, 'tier': None, 'cached': False,
+            'parse_cpu': 0.0}
+
+
+def _cached_details(result, entry):
+    result.update(text=entry['description'], error=entry['error'], tier=entry['tier'], cached=True)
+    return result
+
+
+def _cache_satisfies(entry, render):
+    """
+    Whether a cached entry can be served to a request with this render
+    mode: it was extracted with at least as much rendering, it already came
+    from rendered HTML, or there is no page to extract again.
+    """
+    if not entry['html'] or entry['tier'] == TIER_RENDERED:
+        return True
+    if entry['render'] not in RENDER_ORDER:
+        return False
+    return RENDER_ORDER.index(entry['render']) >= RENDER_ORDER.index(render)
+
+
+def _validator_headers(entry):
+    """Conditional request headers to revalidate a stale cache entry."""
+    headers = {}
+    if entry:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def _lookup_cache(cache, url, metrics, domain):
+    """
+    Look ``url`` up in the page cache, counting the hit or miss. Returns the
+    entry (None if there is none) and whether the page has to be fetched.
+    """
+    entry = cache.get(url) if cache is not None else None
+    if entry and entry['fresh']:
+        metrics.increment('cache_hits', domain=domain)
+        return entry, False
+    if cache is not None:
+        metrics.increment('cache_misses', domain=domain)
+    return entry, True
+
+
+def _settle_page(result, url, entry, page, render, cache, metrics, domain):
+    """
+    Settle a scrape's page against the cache once any fetch is done.
+
+    ``page`` is what ``_fetch_page`` returned, or None if nothing was
+    fetched. Returns None when ``result`` is already complete (served from
+    the cache, or the Content-Type was rejected), otherwise the page to
+    extract as ``(html, etag, last_modified, fetched_at)``.
+    """
+    if page is None:
+        # No page and a stale entry: the fetch was a 304 Not Modified
+        if not entry['fresh']:
+            metrics.increment('cache_revalidations', domain=domain)
+            cache.revalidated(url)
+        if _cache_satisfies(entry, render):
+            _cached_details(result, entry)
+            return None
+        # Cached with less rendering than asked for: extract again from the stored page
+        fetched_at = entry['fetched_at'] if entry['fresh'] else None
+        return entry['html'], entry['etag'], entry['last_modified'], fetched_at
+
+    html, result['error'], headers = page
+    if result['error']:
+        logger.info("Skipping %s: %s", url, result['error'])
+        metrics.increment('rejected_content_types', domain=domain)
+        if cache is not None:
+            cache.put(url, "", "", result['error'])
+        return None
+    return html, headers.get('ETag'), headers.get('Last-Modified'), None
+
+
+def _store_result(cache, url, result, source, render, render_failed):
+    """Cache an extracted ``result`` along with the ``source`` page it came from."""
+    # A result from after a failed render isn't cached, so the next request renders again
+    if cache is None or render_failed:
+        return
+    html, etag, last_modified, fetched_at = source
+    cache.put(url, html, result['text'], result['error'], tier=result['tier'], etag=etag,
+              last_modified=last_modified, render=render, fetched_at=fetched_at)
+
+
+def _fetch_page(session_pool, url, entry, max_body_bytes, metrics, domain):
+    """
+    Fetch a page for ``scrape_url_details``, revalidating the stale cache
+    ``entry`` if there is one. Returns None when the entry is still valid
+    (``304 Not Modified``), or ``(html, error, headers)``, where ``error``
+    rejects the Content-Type and ``html`` is then empty. Raises if the
+    fetch fails.
+    """
+    with metrics.timer('fetch', domain=domain):
+        response = session_pool.get(url, headers=_validator_headers(entry), stream=True)
+        if entry and response.status_code == 304:
+            response.close()
+            return None
+        if response.status_code >= 400:
+            response.close()
+        response.raise_for_status()
+
+        error = _content_type_error(response.headers)
+        if error:
+            response.close()
+            return "", error, response.headers
+        body, truncated = _read_body(response, max_body_bytes)
+
+    if truncated:
+        logger.warning("Response from %s is larger than %d bytes; using the first %d",
+                       url, max_body_bytes, max_body_bytes)
+        metrics.increment('truncated_bodies', domain=domain)
+    metrics.increment('bytes_fetched', len(body), domain=domain)
+    return _decode_body(body, response.headers), "", response.headers
+
+
+def scrape_url_details(url, session_pool=None, render=RENDER_AUTO, browser_pool=None,
+                       cache=None, profiles=None, max_body_bytes=MAX_BODY_BYTES,
+                       extract_pool=None):
+    """
+    Scrape a URL and return a dict describing the result.
+
+    The dict has ``url``, ``text``, ``error``, ``tier``, ``cached`` and
+    ``parse_cpu`` keys. ``tier`` is ``'static'`` or ``'rendered'``
+    depending on which HTML the description came from (``None`` if the
+    fetch failed), ``cached`` is True when the result was served from the
+    page cache, and ``parse_cpu`` is the CPU seconds spent parsing and
+    evaluating selectors.
+
+    ``render`` is one of:
+      - ``'auto'``: try the static HTML first and only render JavaScript when
+        no description longer than ``MIN_DESCRIPTION_LENGTH`` characters was
+        found. Hosts are learned in ``profiles`` (the shared
+        ``DomainProfileStore`` by default, or ``False`` to disable): hosts
+        that needed rendering are rendered straight away, hosts whose static
+        HTML was enough are never rendered, and each host's working selector
+        is tried before the generic scan.
+      - ``'always'``: always render JavaScript before extracting.
+      - ``'never'``: only use the static HTML.
+
+    Rendering borrows a browser from ``browser_pool`` (the shared pool by
+    default). Results are read from and written to ``cache`` (the shared
+    ``PageCache`` by default, or pass ``False`` to disable caching); stale
+    entries are revalidated with ``If-None-Match``/``If-Modified-Since``.
+    A page cached with a render mode that renders less than ``render`` (see
+    ``RENDER_ORDER``) is extracted again from the stored HTML, and results
+    from after a failed render are not cached.
+
+    The response body is streamed and only its first ``max_body_bytes``
+    are kept. Responses whose Content-Type isn't in ``HTML_CONTENT_TYPES``
+    are rejected from the headers without reading the body.
+
+    With an ``extract_pool`` (an ``ExtractWorkerPool``), parsing and any
+    rendering run in its worker processes, with their own browsers, instead
+    of this one; ``parse_cpu`` is then the worker's CPU time.
+    """
+    if render not in RENDER_MODES:
+        raise ValueError(f"render must be one of {RENDER_MODES}, got {render!r}")
+
+    if session_pool is None:
+        session_pool = get_session_pool()
+    browser_pool, cache, profiles = _resolve_shared(browser_pool, cache, profiles)
+
+    result = _new_details(url)
+    metrics = get_metrics()
+    domain = urlparse(url).netloc.lower() if metrics.enabled else None
+
+    entry, fetch = _lookup_cache(cache, url, metrics, domain)
+    page = None
+    if fetch:
+        try:
+            page = _fetch_page(session_pool, url, entry, max_body_bytes, metrics, domain)
+        except Exception as e:
+            logger.warning("Error fetching URL %s: %s", url, e)
+            metrics.increment('fetch_errors', domain=domain)
+            result['error'] = e
+            return result
+
+    source = _settle_page(result, url, entry, page, render, cache, metrics, domain)
+    if source is None:
+        return result
+    html = source[0]
+
+    if extract_pool is not None:
+        try:
+            extracted = extract_pool.extract(url, html, render, profiles=profiles)
+        except Exception as e:
+            logger.warning("Error extracting %s: %s", url, e)
+            metrics.increment('extract_failures', domain=domain)
+            result['error'] = e
+            return result
+        result['text'], result['error'], result['tier'], render_failed, result['parse_cpu'] = (
+            extracted
+        )
+    else:
+        cpu_started = time.thread_time()
+        result['text'], result['error'], result['tier'], render_failed = _extract_tiered(
+            url, html, render, browser_pool, profiles
+        )
+        # Rendering runs on the browser pool's thread, so this is parse/select time only
+        result['parse_cpu'] = time.thread_time() - cpu_started
+    metrics.observe('parse_cpu', result['parse_cpu'], domain=domain)
+
+    _store_result(cache, url, result, source, render, render_failed)
+    return result
+
+
+def scrape_url(url, session_pool=None, render=RENDER_AUTO, browser_pool=None, cache=None,
+               profiles=None, max_body_bytes=MAX_BODY_BYTES, extract_pool=None):
+    """
+    Scrape a URL and return the job description.
+
+    See ``scrape_url_details`` for the ``session_pool``, ``render``,
+    ``browser_pool``, ``cache``, ``profiles``, ``max_body_bytes`` and
+    ``extract_pool`` options.
+    """
+    result = scrape_url_details(url, session_pool=session_pool, render=render,
+                                browser_pool=browser_pool, cache=cache, profiles=profiles,
+                                max_body_bytes=max_body_bytes, extract_pool=extract_pool)
+    return (result['text'], result['error'])
+
+
+def iter_scrape_urls(urls, max_concurrency=MAX_CONCURRENCY, per_host_limit=PER_HOST_LIMIT,
+                     session_pool=None, render=RENDER_AUTO, browser_pool=None, cache=None,
+                     profiles=None, max_body_bytes=MAX_BODY_BYTES, extract_pool=None):
+    """
+    Scrape URLs in parallel and yield ``(position, details)`` pairs as each
+    one finishes, where ``details`` is a ``scrape_url_details`` dict and
+    ``position`` is the URL's index in ``urls``.
+
+    Fetching and extraction run on a thread pool of ``max_concurrency``
+    workers, and at most ``per_host_limit`` requests are in flight against
+    any single host at a time. URLs wait in a queue per host and are only
+    handed to the pool when their host has a free slot, so a busy host
+    never ties up workers that other hosts could use. ``urls`` may be a
+    lazy iterable: only about twice ``max_concurrency`` URLs are queued at
+    once, so results that have not been consumed yet are all that is held
+    in memory.
+
+    Each ``details`` dict also gets an ``elapsed`` key: the seconds spent
+    fetching and extracting that URL, excluding time waiting for a slot.
+    """
+    def scrape_one(url):
+        started = time.perf_counter()
+        try:
+            details = scrape_url_details(url, session_pool=session_pool, render=render,
+                                         browser_pool=browser_pool, cache=cache,
+                                         profiles=profiles, max_body_bytes=max_body_bytes,
+                                         extract_pool=extract_pool)
+        except Exception as e:
+            logger.warning("Error scraping URL %s: %s", url, e)
+            details = _new_details(url, error=e)
+        details['elapsed'] = time.perf_counter() - started
+        return details
+
+    workers = max(1, max_concurrency)
+    host_limit = max(1, per_host_limit)
+    queue_size = workers * 2
+    url_iter = enumerate(urls)
+    # URLs read but not started, per host in first-seen order, and how many are queued
+    waiting = {}
+    queued = 0
+    # Running futures -> (position, host), and how many are running per host
+    running = {}
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit_more():
+            nonlocal queued
+            while queued < queue_size:
+                try:
+                    position, url = next(url_iter)
+                except StopIteration:
                     break
+                host = urlparse(url).netloc.lower()
+                waiting.setdefault(host, deque()).append((position, url))
+                queued += 1
 
-        if job_description:
-            # print("\nJob Description:")
-            # print("=" * 50)
-            # print(job_description[:1000] + "..." if len(job_description) > 1000 else job_description)
-            return (job_description, "")
-        else:
-            print("\nCould not extract job description. Full page text:")
-            print("=" * 50)
-            print(all_text)
-            return ("", "Could not extract job description. Full page text:")
+            # Start URLs whose host has a free slot, while there are idle workers
+            for host, host_queue in list(waiting.items()):
+                while (host_queue and len(running) < workers
+                       and in_flight.get(host, 0) < host_limit):
+                    position, url = host_queue.popleft()
+                    queued -= 1
+                    in_flight[host] = in_flight.get(host, 0) + 1
+                    running[executor.submit(scrape_one, url)] = position, host
+                if not host_queue:
+                    del waiting[host]
 
-    return ("", "Job not found")
+        try:
+            submit_more()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                finished = []
+                for future in done:
+                    position, host = running.pop(future)
+                    in_flight[host] -= 1
+                    if not in_flight[host]:
+                        del in_flight[host]
+                    finished.append((position, future))
+                submit_more()
+                for position, future in finished:
+                    yield position, future.result()
+        finally:
+            # The caller stopped early: don't start anything else
+            for future in running:
+                future.cancel()
 
 
+def scrape_urls(urls, max_concurrency=MAX_CONCURRENCY, per_host_limit=PER_HOST_LIMIT,
+                session_pool=None, render=RENDER_AUTO, details=False, browser_pool=None,
+                cache=None, profiles=None, max_body_bytes=MAX_BODY_BYTES, extract_pool=None):
+    """
+    Scrape several URLs in parallel and return their job descriptions.
+
+    Results are ``(text, error)`` tuples, in the same order as ``urls``, or
+    ``scrape_url_details`` dicts if ``details`` is set. See
+    ``iter_scrape_urls`` for the concurrency limits and
+    ``scrape_url_details`` for the other options.
+    """
+    urls = list(urls)
+    results = [None] * len(urls)
+
+    for position, result in iter_scrape_urls(urls, max_concurrency=max_concurrency,
+                                             per_host_limit=per_host_limit,
+                                             session_pool=session_pool, render=render,
+                                             browser_pool=browser_pool, cache=cache,
+                                             profiles=profiles, max_body_bytes=max_body_bytes,
+                                             extract_pool=extract_pool):
+        results[position] = result if details else (result['text'], result['error'])
+
+    return results
+
 
 if __name__ == "__main__":
-    url = "https://careers.datadoghq.com/detail/6970128/?gh_jid=6970128&gh_src=8363eca61"
-    print(scrape_url(url))
\ No newline at end of file
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(name)s: %(message)s')
+    urls = sys.argv[1:] or ["https://careers.datadoghq.com/detail/6970128/?gh_jid=6970128&gh_src=8363eca61"]
+    for url, result in zip(urls, scrape_urls(urls)):
+        print(url, result)
\ No newline at end of file
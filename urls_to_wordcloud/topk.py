@@ -0,0 +1,121 @@
+import heapq
+from collections import namedtuple
+from operator import itemgetter
+
+
+# A heavy hitter: ``item`` occurred between ``count - error`` and ``count`` times
+TopItem = namedtuple('TopItem', ['item', 'count', 'error'])
+
+SPACE_SAVING_CAPACITY = 10_000
+
+
+def top_k(counts, k=10):
+    """
+    Return the ``k`` items with the highest counts from a mapping or an
+    iterable of ``(item, count)`` pairs, highest first.
+
+    Uses heap selection, so it costs O(n log k) rather than sorting all n
+    items. Ties keep the order the items were seen in.
+    """
+    if k is None or k <= 0:
+        return []
+
+    items = counts.items() if hasattr(counts, 'items') else counts
+    return heapq.nlargest(k, items, key=itemgetter(1))
+
+
+class SpaceSaving:
+    """
+    Approximate top-K counting over a stream in bounded memory, using the
+    Space-Saving algorithm (Metwally et al., 2005).
+
+    At most ``capacity`` items are tracked. When a new item arrives and the
+    table is full, the item with the lowest count is replaced and the new
+    item inherits that count as its overestimation error. Every reported
+    count is an upper bound on the true count, and ``count - error`` a lower
+    bound; any item occurring more than ``total / capacity`` times is
+    guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity=SPACE_SAVING_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self.capacity = capacity
+        self.total = 0
+        self._counts = {}
+        self._errors = {}
+        # Min-heap of (count, item); entries whose count is out of date are skipped
+        self._heap = []
+
+    def add(self, item, count=1):
+        """Count ``count`` more occurrences of ``item``."""
+        self.total += count
+        counts = self._counts
+
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.capacity:
+            counts[item] = count
+            self._errors[item] = 0
+        else:
+            evicted, minimum = self._pop_minimum()
+            del counts[evicted]
+            del self._errors[evicted]
+            counts[item] = minimum + count
+            self._errors[item] = minimum
+
+        heapq.heappush(self._heap, (counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, item) for item, count in counts.items()]
+            heapq.heapify(self._heap)
+
+    def update(self, items):
+        """Count each item of an iterable, or each ``(item, count)`` of a mapping."""
+        if hasattr(items, 'items'):
+            for item, count in items.items():
+                self.add(item, count)
+        else:
+            for item in items:
+                self.add(item)
+
+    def _pop_minimum(self):
+        heap = self._heap
+        counts = self._counts
+        while True:
+            count, item = heapq.heappop(heap)
+            if counts.get(item) == count:
+                return item, count
+
+    @property
+    def max_error(self):
+        """The largest possible overestimate of any reported count."""
+        return max(self._errors.values(), default=0)
+
+    def top(self, k=10):
+        """Return the ``k`` heaviest items as ``TopItem`` tuples, highest count first."""
+        errors = self._errors
+        return [TopItem(item, count, errors[item])
+                for item, count in top_k(self._counts, k)]
+
+    def guaranteed(self, k=10):
+        """
+        Return the items among the top ``k`` whose rank is certain: their
+        lower bound is at least the count of the (k+1)-th item.
+        """
+        ranked = self.top(k + 1)
+        threshold = ranked[k].count if len(ranked) > k else 0
+        return [entry for entry in ranked[:k] if entry.count - entry.error >= threshold]
+
+    def items(self):
+        return self._counts.items()
+
+    def __getitem__(self, item):
+        return self._counts.get(item, 0)
+
+    def __contains__(self, item):
+        return item in self._counts
+
+    def __len__(self):
+        return len(self._counts)
+
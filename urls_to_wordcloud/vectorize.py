@@ -0,0 +1,135 @@
+from array import array
+
+import numpy as np
+
+from .generate_wordcloud import get_preprocessor
+
+
+WEIGHTING_COUNT = 'count'
+WEIGHTING_DOCUMENT_FREQUENCY = 'df'
+WEIGHTING_TFIDF = 'tfidf'
+WEIGHTINGS = (WEIGHTING_COUNT, WEIGHTING_DOCUMENT_FREQUENCY, WEIGHTING_TFIDF)
+
+
+class DocumentTermMatrix:
+    """
+    A sparse document-term matrix over a corpus, with a vocabulary index.
+
+    ``matrix`` is a SciPy CSR matrix of raw counts with one row per document
+    and one column per term; ``vocabulary[j]`` is the term in column ``j``.
+    Counts, document frequencies and TF-IDF weights are all computed as
+    vectorized operations on it, and ``to_dict``/``top`` select terms with
+    ``argpartition`` rather than sorting the whole vocabulary. SciPy is
+    imported when the first matrix is built.
+    """
+
+    def __init__(self, matrix, vocabulary):
+        self.matrix = matrix
+        self.vocabulary = vocabulary
+        self.term_index = {term: j for j, term in enumerate(vocabulary)}
+
+    @classmethod
+    def from_texts(cls, texts, n_gram_size=1, preprocessor=None):
+        """Tokenize an iterable of texts into a document-term matrix."""
+        preprocessor = preprocessor or get_preprocessor()
+        term_index = {}
+        vocabulary = []
+        indices = array('i')
+        indptr = array('q', [0])
+
+        for text in texts:
+            for term in preprocessor.preprocess(text, n_gram_size):
+                j = term_index.get(term)
+                if j is None:
+                    j = term_index[term] = len(vocabulary)
+                    vocabulary.append(term)
+                indices.append(j)
+            indptr.append(len(indices))
+
+        from scipy import sparse
+
+        indices = np.array(indices, dtype=np.int32)
+        indptr = np.array(indptr, dtype=np.int64)
+        data = np.ones(len(indices), dtype=np.int32)
+
+        matrix = sparse.csr_matrix((data, indices, indptr),
+                                   shape=(len(indptr) - 1, len(vocabulary)))
+        # Each token was added as its own entry; fold repeats into counts
+        matrix.sum_duplicates()
+        return cls(matrix, vocabulary)
+
+    @property
+    def n_documents(self):
+        return self.matrix.shape[0]
+
+    def counts(self):
+        """Total count of each term across all documents."""
+        return np.asarray(self.matrix.sum(axis=0)).ravel()
+
+    def document_frequency(self):
+        """Number of documents each term appears in."""
+        return np.bincount(self.matrix.indices, minlength=len(self.vocabulary))
+
+    def tfidf(self, sublinear_tf=False):
+        """
+        Return the TF-IDF matrix: smoothed IDF, ``ln((1 + n) / (1 + df)) + 1``,
+        with each document row L2-normalized.
+        """
+        from scipy import sparse
+
+        tf = self.matrix.astype(np.float64)
+        if sublinear_tf:
+            tf.data = np.log(tf.data) + 1
+
+        idf = np.log((1 + self.n_documents) / (1 + self.document_frequency())) + 1
+        weighted = sparse.csr_matrix(tf.multiply(idf))
+
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.csr_matrix(weighted.multiply(1 / norms[:, np.newaxis]))
+
+    def weights(self, weighting=WEIGHTING_COUNT):
+        """Return one weight per term: raw counts, document frequency, or summed TF-IDF."""
+        if weighting == WEIGHTING_COUNT:
+            return self.counts()
+        if weighting == WEIGHTING_DOCUMENT_FREQUENCY:
+            return self.document_frequency()
+        if weighting == WEIGHTING_TFIDF:
+            return np.asarray(self.tfidf().sum(axis=0)).ravel()
+        raise ValueError(f"weighting must be one of {WEIGHTINGS}, got {weighting!r}")
+
+    def _select(self, weights, min_frequency=1, top_n=None):
+        """Indices of terms with count >= min_frequency, the top_n heaviest first."""
+        selected = np.flatnonzero(self.counts() >= min_frequency)
+
+        if top_n is not None and len(selected) > top_n:
+            if top_n <= 0:
+                return selected[:0]
+            heaviest = np.argpartition(-weights[selected], top_n - 1)[:top_n]
+            selected = selected[heaviest]
+
+        return selected[np.argsort(-weights[selected], kind='stable')]
+
+    def to_dict(self, weighting=WEIGHTING_COUNT, min_frequency=1, top_n=None):
+        """
+        Return ``{term: weight}`` for terms appearing at least
+        ``min_frequency`` times, keeping only the ``top_n`` heaviest if
+        given. The result can be passed straight to ``generate_wordcloud``.
+        """
+        weights = self.weights(weighting)
+        return {self.vocabulary[j]: weights[j].item()
+                for j in self._select(weights, min_frequency, top_n)}
+
+    def top(self, top_n=10, weighting=WEIGHTING_COUNT, min_frequency=1):
+        """Return the ``top_n`` heaviest terms as ``(term, weight)`` pairs."""
+        return list(self.to_dict(weighting, min_frequency, top_n).items())
+
+
+def calculate_word_weights(texts, min_frequency=1, n_gram_size=1, weighting=WEIGHTING_TFIDF,
+                           preprocessor=None, top_n=None):
+    """
+    Like ``calculate_word_frequencies``, but weighted per ``weighting``
+    ('count', 'df' or 'tfidf') using a sparse document-term matrix.
+    """
+    matrix = DocumentTermMatrix.from_texts(texts, n_gram_size, preprocessor)
+    return matrix.to_dict(weighting, min_frequency, top_n)
@@ -0,0 +1,325 @@
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from .browser_pool import BrowserPool, _process_tree_rss_mb
+from .metrics import get_metrics
+from .scrape_url import RENDER_AUTO, _extract_tiered
+
+
+logger = logging.getLogger('urls_to_wordcloud.worker_pool')
+
+# Memory to budget per worker: one Chromium plus the parser
+WORKER_MEMORY_BUDGET_MB = 1024
+# Seconds an extraction (including any rendering) may take before its worker is killed
+EXTRACT_JOB_TIMEOUT = 60
+# Workers are replaced after this many jobs, or when their process tree
+# (worker and browser) uses more than MAX_WORKER_MEMORY_MB
+JOBS_PER_WORKER = 200
+MAX_WORKER_MEMORY_MB = 1536
+# Seconds a worker gets to exit cleanly before it is terminated
+WORKER_SHUTDOWN_TIMEOUT = 10
+
+
+def _default_worker_count():
+    """One worker per core, as far as WORKER_MEMORY_BUDGET_MB per worker fits in RAM."""
+    workers = os.cpu_count() or 1
+    try:
+        memory_mb = os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+        workers = min(workers, memory_mb // WORKER_MEMORY_BUDGET_MB)
+    except (AttributeError, OSError, ValueError):
+        pass
+    return max(1, workers)
+
+
+EXTRACT_WORKERS = int(os.environ.get('JD_WORDCLOUD_EXTRACT_WORKERS') or _default_worker_count())
+
+
+class _ProfileRecorder:
+    """
+    Stands in for the caller's ``DomainProfileStore`` inside a worker: it
+    serves the profile the caller looked up for the page's host, and records
+    what was learned for the caller to apply to its own store.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.updates = []
+
+    def get(self, host):
+        return dict(self.profile) if self.profile else None
+
+    def record_success(self, host, selector, rendered):
+        self.updates.append(('record_success', host, selector, rendered))
+
+    def record_miss(self, host):
+        self.updates.append(('record_miss', host))
+
+
+def _worker_main(conn):
+    """
+    Run extraction jobs from ``conn`` until it is closed or sent None.
+
+    Each worker renders with its own single-browser ``BrowserPool``, so a
+    hung or bloated browser only takes its worker down with it. Profile
+    updates and metrics are sent back with each result rather than kept
+    here, so the caller's store and registry see every worker's.
+    """
+    # Ctrl-C is for the parent, which shuts the workers down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    browser_pool = BrowserPool(size=1)
+    metrics = get_metrics()
+
+    try:
+        while True:
+            try:
+                job = conn.recv()
+            except EOFError:
+                break
+            if job is None:
+                break
+
+            url, html, render, learn, profile, collect_metrics = job
+            profiles = _ProfileRecorder(profile) if learn else None
+            metrics.reset()
+            metrics.enabled = collect_metrics
+
+            started = time.thread_time()
+            try:
+                extracted = _extract_tiered(url, html, render, browser_pool, profiles)
+            except Exception as e:
+                conn.send((False, f"{type(e).__name__}: {e}"))
+            else:
+                conn.send((True, (extracted + (time.thread_time() - started,),
+                                  profiles.updates if learn else [],
+                                  metrics.snapshot() if collect_metrics else None)))
+    finally:
+        browser_pool.close()
+
+
+class _Worker:
+    def __init__(self, context, name):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), name=name,
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def stop(self, timeout=WORKER_SHUTDOWN_TIMEOUT):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ExtractWorkerError(RuntimeError):
+    """An extraction job failed inside a worker process, or its worker died."""
+
+
+class ExtractWorkerPool:
+    """
+    A pool of worker processes that extract descriptions from fetched pages,
+    rendering JavaScript in their own browsers when needed.
+
+    Keeping parsing and Chromium out of the calling process means a slow or
+    hung page can't block it and browser memory doesn't build up in it:
+
+      - At most ``workers`` jobs run at once, one per process. Callers
+        beyond that wait for a free worker, which in turn holds back the
+        fetches feeding them.
+      - A job that takes longer than ``job_timeout`` seconds has its worker
+        killed and replaced, and raises ``TimeoutError``.
+      - Workers are replaced after ``jobs_per_worker`` jobs, when their
+        process tree uses more than ``max_memory_mb``, or when they die.
+
+    Workers are started on first use with the ``spawn`` method, so the
+    calling process's threads and state aren't forked. Use the pool as a
+    context manager or call ``close()`` when done.
+    """
+
+    def __init__(self, workers=EXTRACT_WORKERS, job_timeout=EXTRACT_JOB_TIMEOUT,
+                 jobs_per_worker=JOBS_PER_WORKER, max_memory_mb=MAX_WORKER_MEMORY_MB,
+                 start_method='spawn'):
+        self.workers = max(1, workers)
+        self.job_timeout = job_timeout
+        self.jobs_per_worker = jobs_per_worker
+        self.max_memory_mb = max_memory_mb
+
+        self._context = multiprocessing.get_context(start_method)
+        # Free worker slots; None is a slot whose worker hasn't been started yet
+        self._idle = queue.Queue()
+        for _ in range(self.workers):
+            self._idle.put(None)
+        self._running = set()
+        self._started = 0
+        self._dispatcher = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _start_worker(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ExtractWorkerPool is closed")
+            self._started += 1
+            worker = _Worker(self._context, name=f'extract-worker-{self._started}')
+            self._running.add(worker)
+            return worker
+
+    def _discard(self, worker, kill=False):
+        with self._lock:
+            self._running.discard(worker)
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+
+    def _should_recycle(self, worker):
+        if worker.jobs >= self.jobs_per_worker:
+            return True
+        if self.max_memory_mb:
+            memory = _process_tree_rss_mb(worker.process.pid)
+            return memory is not None and memory > self.max_memory_mb
+        return False
+
+    def extract(self, url, html, render=RENDER_AUTO, profiles=None):
+        """
+        Extract the description from a fetched page in a worker process and
+        return ``(text, error, tier, render_failed, parse_cpu)``, like
+        ``_extract_tiered`` plus the worker's CPU seconds. Blocks until a
+        worker is free.
+
+        The host's profile is looked up in ``profiles`` (a
+        ``DomainProfileStore``, or None to neither use nor learn profiles)
+        here and sent with the job, and what the worker learned is recorded
+        back into it, as are the worker's metrics into ``get_metrics()``.
+        Raises ``TimeoutError`` if the job takes longer than
+        ``job_timeout``, and ``ExtractWorkerError`` if it fails.
+        """
+        if self._closed:
+            raise RuntimeError("ExtractWorkerPool is closed")
+
+        metrics = get_metrics()
+        profile = None
+        if profiles is not None and render == RENDER_AUTO:
+            profile = profiles.get(urlparse(url).netloc.lower())
+        job = (url, html, render, profiles is not None, profile, metrics.enabled)
+
+        worker = self._idle.get()
+        try:
+            if worker is not None and not worker.process.is_alive():
+                self._discard(worker, kill=True)
+                worker = None
+            if worker is None:
+                worker = self._start_worker()
+
+            try:
+                worker.conn.send(job)
+                finished = worker.conn.poll(self.job_timeout)
+                if finished:
+                    ok, value = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                self._discard(worker, kill=True)
+                worker = None
+                raise ExtractWorkerError(f"Extract worker died while processing {url}") from e
+
+            if not finished:
+                logger.warning("Extraction of %s took over %ss; restarting its worker",
+                               url, self.job_timeout)
+                self._discard(worker, kill=True)
+                worker = None
+                raise TimeoutError(f"Extraction timed out after {self.job_timeout}s")
+
+            worker.jobs += 1
+            if self._should_recycle(worker):
+                self._discard(worker)
+                worker = None
+        finally:
+            # Hand the slot back; a None slot starts a fresh worker when next used
+            self._idle.put(worker)
+
+        if not ok:
+            raise ExtractWorkerError(value)
+
+        extracted, profile_updates, worker_metrics = value
+        for method, *args in profile_updates:
+            getattr(profiles, method)(*args)
+        if worker_metrics:
+            metrics.merge(worker_metrics)
+        return extracted
+
+    def _get_dispatcher(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ExtractWorkerPool is closed")
+            if self._dispatcher is None:
+                self._dispatcher = ThreadPoolExecutor(max_workers=self.workers,
+                                                      thread_name_prefix='extract-dispatch')
+            return self._dispatcher
+
+    async def extract_async(self, url, html, render=RENDER_AUTO, profiles=None):
+        """
+        Like ``extract``, but awaitable. Jobs wait on the pool's own
+        dispatcher threads, one per worker, rather than the event loop's.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_dispatcher(), self.extract, url, html,
+                                          render, profiles)
+
+    def close(self):
+        """Stop every worker and its browser."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._running)
+            self._running.clear()
+            dispatcher = self._dispatcher
+
+        if dispatcher is not None:
+            dispatcher.shutdown(wait=False, cancel_futures=True)
+        for worker in workers:
+            try:
+                worker.stop()
+            except Exception as e:
+                logger.warning("Error stopping extract worker: %s", e)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_default_extract_pool = None
+_default_extract_pool_lock = threading.Lock()
+
+
+def get_extract_pool():
+    """Return the process-wide extract worker pool, creating it on first use."""
+    global _default_extract_pool
+
+    with _default_extract_pool_lock:
+        if _default_extract_pool is None:
+            _default_extract_pool = ExtractWorkerPool()
+            atexit.register(_default_extract_pool.close)
+        return _default_extract_pool